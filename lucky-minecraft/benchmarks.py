@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmarks for the lucky-minecraft scripts.
+
+  python benchmarks.py json [--repeat 20]
+      relaxed JSON parsing: tacz_build_summary.loads_relaxed vs the old
+      three-regex implementation, on the bundled index_*_data.json samples
+      (as-is and with // comments, /* */ blocks and trailing commas added).
+
+  python benchmarks.py voxel [--size 48] [--repeat 3]
+      voxel_build.compile_model on generated models: command count vs one
+      setblock per cell, and compile time.
+
+  python benchmarks.py genpack --out DIR [--items 10000] [--namespaces 3]
+      fake gunpacks built from the bundled samples (relaxed JSON, missing data
+      refs, refs into other namespaces), for trying the scripts at scale.
+
+  python benchmarks.py pipeline [--sizes 1000 10000] [--json results.json] [--compare old.json]
+      times each phase on fresh fake packs: scan, parse, enrich, csv_write,
+      csv_read, loot_build, function_write. --compare exits 1 when a phase got
+      slower than --threshold times the old result.
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import make_datapack as mdp
+import tacz_build_summary as tbs
+import voxel_build
+
+HERE = Path(__file__).resolve().parent
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+
+def best_time(fn: Callable[[], Any], repeat: int) -> float:
+    """Best wall time of `repeat` calls, in seconds."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# -----------------------------
+# json: relaxed JSON parsing
+# -----------------------------
+
+# the implementation load_json_relaxed used before the single-pass tokenizer
+_OLD_BLOCK_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_OLD_LINE_COMMENT = re.compile(r"(^|[^\:])//.*?$", re.MULTILINE)
+_OLD_TRAILING_COMMA = re.compile(r",(\s*[\]}])")
+
+def legacy_loads_relaxed(text: str) -> Any:
+    text = _OLD_BLOCK_COMMENT.sub("", text)
+    text = _OLD_LINE_COMMENT.sub(r"\1", text)
+    text = _OLD_TRAILING_COMMA.sub(r"\1", text)
+    return json.loads(text)
+
+
+def make_relaxed_text(obj: Any) -> str:
+    """Dump obj the way hand-edited pack files look: comments + trailing commas."""
+    text = json.dumps(obj, ensure_ascii=False, indent=2)
+    text = re.sub(r"([^\[{\s])(\n\s*[\]}])", r"\1,\2", text)   # trailing commas
+    text = re.sub(r",\n", ", // edited\n", text)                # line comments
+    return "/* generated sample */\n" + text + "\n"
+
+
+def json_samples() -> List[Tuple[str, str]]:
+    samples: List[Tuple[str, str]] = []
+    for fp in sorted(HERE.glob("index_*_data.json")):
+        text = fp.read_text(encoding="utf-8-sig")
+        if not text.strip():
+            continue
+        samples.append((fp.name, text))
+        samples.append((fp.name + " (relaxed)", make_relaxed_text(json.loads(text))))
+    return samples
+
+
+def bench_json(args: argparse.Namespace) -> None:
+    samples = json_samples()
+    if not samples:
+        raise SystemExit(f"No index_*_data.json samples next to {Path(__file__).name}")
+
+    print(f"{'sample':44} {'KiB':>8} {'old ms':>9} {'new ms':>9} {'speedup':>8}  same")
+    for name, text in samples:
+        try:
+            same = legacy_loads_relaxed(text) == tbs.loads_relaxed(text)
+        except ValueError:
+            same = False  # old regexes mangle "//" inside string values
+        t_old = best_time(lambda: legacy_loads_relaxed(text), args.repeat)
+        t_new = best_time(lambda: tbs.loads_relaxed(text), args.repeat)
+        print(f"{name:44} {len(text.encode('utf-8')) / 1024:8.1f} {t_old * 1000:9.2f} {t_new * 1000:9.2f} "
+              f"{t_old / t_new:7.2f}x  {'yes' if same else 'NO'}")
+
+
+# -----------------------------
+# voxel: greedy box merging
+# -----------------------------
+
+def voxel_models(n: int) -> List[Tuple[str, Dict[Tuple[int, int, int], str]]]:
+    rng = random.Random(1)
+    h = max(4, n // 3)
+
+    solid = {(x, y, z): "minecraft:stone" for x in range(n) for y in range(h) for z in range(n)}
+
+    house: Dict[Tuple[int, int, int], str] = {}
+    for x in range(n):
+        for z in range(n):
+            house[(x, 0, z)] = "minecraft:oak_planks"
+            house[(x, h - 1, z)] = "minecraft:dark_oak_planks"
+            for y in range(1, h - 1):
+                if x in (0, n - 1) or z in (0, n - 1):
+                    window = y % 4 == 2 and (x + z) % 5 in (1, 2)
+                    house[(x, y, z)] = "minecraft:glass_pane" if window else "minecraft:stone_bricks"
+                else:
+                    house[(x, y, z)] = "minecraft:air"
+
+    r = n / 2
+    palette = ["minecraft:stone", "minecraft:andesite", "minecraft:cobblestone"]
+    sphere = {(x, y, z): palette[(x // 6 + y // 6 + z // 6) % 3]
+              for x in range(n) for y in range(n) for z in range(n)
+              if math.dist((x + 0.5, y + 0.5, z + 0.5), (r, r, r)) <= r}
+
+    noise = {(x, y, z): rng.choice(palette) for x in range(n) for y in range(h) for z in range(n)
+             if rng.random() < 0.6}
+
+    return [(f"solid {n}x{h}x{n}", solid), (f"house shell {n}x{h}x{n}", house),
+            (f"sphere d={n}, 3 blocks", sphere), (f"noise {n}x{h}x{n}, 60%", noise)]
+
+
+def bench_voxel(args: argparse.Namespace) -> None:
+    print(f"{'model':30} {'cells':>9} {'setblocks':>10} {'commands':>9} {'ratio':>7} {'ms':>9}")
+    for name, blocks in voxel_models(args.size):
+        commands: List[str] = []
+
+        def run() -> None:
+            commands[:] = voxel_build.compile_model(blocks, absolute=(0, 64, 0))
+
+        t = best_time(run, args.repeat)
+        naive = sum(1 for b in blocks.values() if b != voxel_build.AIR) + 1   # + the clearing fill
+        print(f"{name:30} {len(blocks):9} {naive:10} {len(commands):9} {naive / len(commands):6.1f}x {t * 1000:9.1f}")
+
+
+# -----------------------------
+# genpack / pipeline: synthetic large packs
+# -----------------------------
+
+PIPELINE_PHASES = ("scan", "parse", "enrich", "csv_write", "csv_read", "loot_build", "function_write")
+PIPELINE_RESULTS_VERSION = 1
+
+# share of generated index files per category
+GEN_SHARES = {"guns": 0.45, "ammo": 0.10, "attachments": 0.45}
+GEN_MISSING_DATA = 0.03     # index files whose data ref points nowhere
+GEN_CROSS_NAMESPACE = 0.05  # data refs into another pack's namespace
+GEN_RELAXED = 0.5           # files written with comments + trailing commas
+
+
+def sample_raw(category: str, kind: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """(basename, raw object) of the bundled index_<category>_<kind>.json samples."""
+    fp = HERE / f"index_{category}_{kind}.json"
+    if not fp.is_file():
+        return []
+    text = fp.read_text(encoding="utf-8-sig")
+    return [(e["basename"], e["raw"]) for e in (json.loads(text) if text.strip() else [])
+            if isinstance(e.get("raw"), dict)]
+
+
+def _write_pack_json(fp: Path, obj: Dict[str, Any], relaxed: bool) -> None:
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    text = make_relaxed_text(obj) if relaxed else json.dumps(obj, ensure_ascii=False, indent=2)
+    fp.write_text(text, encoding="utf-8")
+
+
+def generate_packs(root: Path, items: int, namespaces: int = 3, seed: int = 1) -> Dict[str, int]:
+    """
+    Writes `namespaces` fake gunpacks (root/<ns>_pack/data/<ns>/{index,data}/...) with
+    `items` index files in total, built from the bundled samples. Mixes in relaxed JSON,
+    missing data refs and refs into other namespaces. Returns file counts.
+    """
+    templates = {c: sample_raw(c, "index") for c in GEN_SHARES}
+    data_templates = {c: [raw for _name, raw in sample_raw(c, "data")] for c in ("guns", "attachments")}
+    if not all(templates.values()) or not all(data_templates.values()):
+        raise SystemExit(f"No index_*_index.json / index_*_data.json samples next to {Path(__file__).name}")
+
+    rng = random.Random(seed)
+    ns_list = ["tacz"] + [f"bench{i}" for i in range(1, max(1, namespaces))]
+    counts = {"index": 0, "data": 0, "missing": 0}
+    ammo_ids: List[str] = []
+
+    for category in ("ammo", "guns", "attachments"):
+        n = max(1, round(items * GEN_SHARES[category]))
+        for i in range(n):
+            ns = ns_list[i % len(ns_list)]
+            base, raw = templates[category][i % len(templates[category])]
+            stem = f"{base}_{i}"
+            pack_dir = root / f"{ns}_pack" / "data" / ns
+            obj = dict(raw)
+
+            if category == "ammo":
+                ammo_ids.append(f"{ns}:{stem}")
+            else:
+                data_ns = rng.choice(ns_list) if rng.random() < GEN_CROSS_NAMESPACE else ns
+                obj["data"] = f"{data_ns}:{stem}_data"
+                if rng.random() < GEN_MISSING_DATA:
+                    counts["missing"] += 1
+                else:
+                    data = dict(data_templates[category][i % len(data_templates[category])])
+                    if category == "guns":
+                        data["ammo"] = ammo_ids[i % len(ammo_ids)]
+                    data_dir = root / f"{data_ns}_pack" / "data" / data_ns / "data" / category
+                    _write_pack_json(data_dir / f"{stem}_data.json", data, rng.random() < GEN_RELAXED)
+                    counts["data"] += 1
+
+            _write_pack_json(pack_dir / "index" / category / f"{stem}.json", obj, rng.random() < GEN_RELAXED)
+            counts["index"] += 1
+    return counts
+
+
+def run_pipeline(root: Path, work: Path, dp_args: argparse.Namespace) -> Tuple[Dict[str, float], int]:
+    """One pass of tacz_build_summary.py + make_datapack.py over root; seconds per phase, rows."""
+    clock = time.perf_counter
+    times: Dict[str, float] = {}
+    errors: List[str] = []
+
+    t0 = clock()
+    packs = tbs.discover_pack_roots(root)
+    data_index = tbs.DataFileIndex(packs)
+    times["scan"] = clock() - t0
+
+    # index files only (no data files found => no enrichment) ...
+    t0 = clock()
+    no_data = tbs.DataFileIndex([])
+    for pack in packs:
+        for _row in tbs.iter_pack_rows(pack, errors, data_index=no_data):
+            pass
+    times["parse"] = clock() - t0
+
+    # ... and the full scan: enrich = the difference
+    t0 = clock()
+    rows = tbs.dedup_rows(r for pack in packs for r in tbs.iter_pack_rows(pack, errors, data_index=data_index))
+    times["enrich"] = max(0.0, clock() - t0 - times["parse"])
+
+    t0 = clock()
+    tbs.write_csv(work / "summary.csv", rows)
+    times["csv_write"] = clock() - t0
+
+    t0 = clock()
+    lookups = mdp.read_summary_csv(work / "summary.csv")
+    times["csv_read"] = clock() - t0
+
+    t0 = clock()
+    loot_files = mdp.build_loot_files(dp_args, lookups)
+    times["loot_build"] = clock() - t0
+
+    t0 = clock()
+    with mdp.open_writer(work / "datapack") as writer:
+        mdp.write_files(writer, mdp.build_function_files(dp_args, mdp.resolve_dests(dp_args)))
+        mdp.write_files(writer, loot_files)
+    times["function_write"] = clock() - t0
+    return times, len(rows)
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[str]:
+    """Prints old vs new per size/phase; returns the regressions (new > old * threshold)."""
+    slower: List[str] = []
+    print(f"\n{'size':>8} {'phase':16} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for size, res in new["results"].items():
+        old_res = old.get("results", {}).get(size)
+        if old_res is None:
+            continue
+        for phase in PIPELINE_PHASES:
+            t_old, t_new = old_res["phases"].get(phase), res["phases"].get(phase)
+            if not t_old or t_new is None:
+                continue
+            ratio = t_new / t_old
+            flag = ""
+            if ratio > threshold:
+                flag = "  SLOWER"
+                slower.append(f"{size}/{phase}")
+            print(f"{size:>8} {phase:16} {t_old * 1000:10.1f} {t_new * 1000:10.1f} {ratio:6.2f}x{flag}")
+    return slower
+
+
+def bench_genpack(args: argparse.Namespace) -> None:
+    out = Path(args.out).expanduser().resolve()
+    counts = generate_packs(out, args.items, args.namespaces, args.seed)
+    print(f"OK: {out} ({counts['index']} index files, {counts['data']} data files, "
+          f"{counts['missing']} missing data refs)")
+
+
+def bench_pipeline(args: argparse.Namespace) -> None:
+    ap = argparse.ArgumentParser()
+    mdp.add_datapack_args(ap)
+    dp_args = ap.parse_args(["--out", "unused", "--minify"])
+
+    result: Dict[str, Any] = {
+        "version": PIPELINE_RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "namespaces": args.namespaces,
+        "seed": args.seed,
+        "results": {},
+    }
+    print(f"{'size':>8} {'rows':>8} " + " ".join(f"{p:>14}" for p in PIPELINE_PHASES) + "   (ms, best of "
+          f"{args.repeat})")
+    with tempfile.TemporaryDirectory(prefix="lwi_bench_") as tmp:
+        for size in args.sizes:
+            root = Path(tmp) / f"packs_{size}"
+            generate_packs(root, size, args.namespaces, args.seed)
+            best: Dict[str, float] = {}
+            rows = 0
+            for run in range(max(1, args.repeat)):
+                times, rows = run_pipeline(root, Path(tmp) / f"work_{size}_{run}", dp_args)
+                for phase, t in times.items():
+                    best[phase] = min(best.get(phase, float("inf")), t)
+            result["results"][str(size)] = {"rows": rows, "phases": best}
+            print(f"{size:8} {rows:8} " + " ".join(f"{best[p] * 1000:14.1f}" for p in PIPELINE_PHASES))
+
+    if args.json:
+        out = Path(args.json).expanduser().resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print("OK:", out)
+
+    if args.compare:
+        old = json.loads(Path(args.compare).expanduser().resolve().read_text(encoding="utf-8"))
+        slower = compare_results(old, result, args.threshold)
+        if slower:
+            raise SystemExit(f"Slower than {args.compare} by more than {args.threshold:.2f}x: {', '.join(slower)}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks for tacz_build_summary.py / make_datapack.py")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("json", help="relaxed JSON parser: old regex passes vs single-pass tokenizer")
+    p.add_argument("--repeat", type=int, default=20, help="Runs per sample, best time is reported")
+    p.set_defaults(func=bench_json)
+
+    p = sub.add_parser("voxel", help="voxel model compiler: merged fill commands vs one setblock per cell")
+    p.add_argument("--size", type=int, default=48, help="Model edge length in blocks")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per model, best time is reported")
+    p.set_defaults(func=bench_voxel)
+
+    p = sub.add_parser("genpack", help="write fake gunpacks built from the bundled samples")
+    p.add_argument("--out", required=True, help="Folder for the packs (pass it to tacz_build_summary.py --root)")
+    p.add_argument("--items", type=int, default=10000, help="Index files in total")
+    p.add_argument("--namespaces", type=int, default=3, help="Packs / namespaces to spread them over")
+    p.add_argument("--seed", type=int, default=1)
+    p.set_defaults(func=bench_genpack)
+
+    p = sub.add_parser("pipeline", help="time every phase of summary + datapack generation on fake packs")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Index files per run")
+    p.add_argument("--namespaces", type=int, default=3, help="Packs / namespaces to spread them over")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--repeat", type=int, default=3, help="Runs per size, best time per phase is reported")
+    p.add_argument("--json", default="", help="Save the results (compare later with --compare)")
+    p.add_argument("--compare", default="", help="Results JSON of an earlier run; exits 1 on regressions")
+    p.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio counted as a regression")
+    p.set_defaults(func=bench_pipeline)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""
+--profile for tacz_build_summary.py and make_datapack.py: where the time and memory go.
+
+  with build_profile.phase("read"):
+      ...
+
+phase() is a no-op until start() is called, so the scripts are instrumented
+unconditionally. Phases nest: "total" includes nested phases, "self" does not.
+Allocations come from tracemalloc (peak above the phase start, and net change),
+which slows the run down 2-3x: compare phases with each other, not with normal runs.
+"""
+
+import argparse
+import heapq
+import json
+import time
+import tracemalloc
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _PhaseStats:
+    __slots__ = ("calls", "total", "self_time", "peak", "net")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.self_time = 0.0
+        self.peak = 0      # max bytes above the phase start, over all calls
+        self.net = 0       # bytes still allocated at phase end, summed over calls
+
+
+class _Frame:
+    __slots__ = ("name", "t0", "child_time", "mem0", "peak")
+
+    def __init__(self, name: str, t0: float, mem0: int):
+        self.name = name
+        self.t0 = t0
+        self.child_time = 0.0
+        self.mem0 = mem0
+        self.peak = mem0
+
+
+class _Phase:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._push(self.name)
+
+    def __exit__(self, *exc):
+        self.profiler._pop()
+        return False
+
+
+class Profiler:
+    def __init__(self, track_memory: bool = True):
+        self.track_memory = track_memory
+        self.phases: Dict[str, _PhaseStats] = {}
+        self.files: List[Tuple[float, int, str]] = []   # (seconds, bytes, path)
+        self._stack: List[_Frame] = []
+        self._t0 = time.perf_counter()
+        self.wall = 0.0
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _memory(self) -> Tuple[int, int]:
+        return tracemalloc.get_traced_memory() if self.track_memory else (0, 0)
+
+    def _push(self, name: str) -> None:
+        current, peak = self._memory()
+        if self._stack:
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, peak)
+        if self.track_memory:
+            tracemalloc.reset_peak()
+        self._stack.append(_Frame(name, time.perf_counter(), current))
+
+    def _pop(self) -> None:
+        frame = self._stack.pop()
+        elapsed = time.perf_counter() - frame.t0
+        current, peak = self._memory()
+        frame.peak = max(frame.peak, peak)
+
+        stats = self.phases.get(frame.name)
+        if stats is None:
+            stats = self.phases[frame.name] = _PhaseStats()
+        stats.calls += 1
+        stats.total += elapsed
+        stats.self_time += elapsed - frame.child_time
+        stats.peak = max(stats.peak, frame.peak - frame.mem0)
+        stats.net += current - frame.mem0
+
+        if self._stack:
+            parent = self._stack[-1]
+            parent.child_time += elapsed
+            parent.peak = max(parent.peak, frame.peak)
+        if self.track_memory:
+            tracemalloc.reset_peak()
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def file(self, path: Any, seconds: float, size: int) -> None:
+        """One input file: read + parse time and size in bytes."""
+        self.files.append((seconds, size, str(path)))
+
+    def stop(self) -> None:
+        self.wall = time.perf_counter() - self._t0
+        if self.track_memory:
+            tracemalloc.stop()
+
+    def as_dict(self, top: int = 10) -> Dict[str, Any]:
+        return {
+            "wall": self.wall or time.perf_counter() - self._t0,
+            "track_memory": self.track_memory,
+            "phases": {
+                name: {"calls": s.calls, "total": s.total, "self": s.self_time, "peak_bytes": s.peak,
+                       "net_bytes": s.net}
+                for name, s in self.phases.items()
+            },
+            "files": len(self.files),
+            "slowest_files": [{"path": p, "seconds": t, "bytes": b} for t, b, p in heapq.nlargest(top, self.files)],
+            "largest_files": [{"path": p, "seconds": t, "bytes": b}
+                              for b, t, p in heapq.nlargest(top, ((b, t, p) for t, b, p in self.files))],
+        }
+
+    def print_report(self, top: int = 10) -> None:
+        data = self.as_dict(top)
+        print(f"\nProfile: {data['wall'] * 1000:.0f} ms wall, {data['files']} input files"
+              + (" (tracemalloc on)" if self.track_memory else ""))
+        print(f"  {'phase':16} {'calls':>8} {'total ms':>10} {'self ms':>10} {'peak KiB':>10} {'net KiB':>10}")
+        for name, s in sorted(data["phases"].items(), key=lambda kv: -kv[1]["self"]):
+            print(f"  {name:16} {s['calls']:8} {s['total'] * 1000:10.1f} {s['self'] * 1000:10.1f} "
+                  f"{s['peak_bytes'] / 1024:10.1f} {s['net_bytes'] / 1024:10.1f}")
+        for title, rows in (("Slowest files", data["slowest_files"]), ("Largest files", data["largest_files"])):
+            if rows:
+                print(f"  {title}:")
+                for r in rows:
+                    print(f"    {r['seconds'] * 1000:8.2f} ms {r['bytes'] / 1024:9.1f} KiB  {r['path']}")
+
+    def write_json(self, path: Path, top: int = 10) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = self.as_dict(top)
+        data["created"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+# -----------------------------
+# Module-level switch
+# -----------------------------
+
+_ACTIVE: Optional[Profiler] = None
+_NULL = nullcontext()
+
+
+def phase(name: str):
+    """Context manager timing `name` while a profiler is running, else a shared no-op."""
+    return _ACTIVE.phase(name) if _ACTIVE is not None else _NULL
+
+
+def active() -> Optional[Profiler]:
+    return _ACTIVE
+
+
+def start(track_memory: bool = True) -> Profiler:
+    global _ACTIVE
+    _ACTIVE = Profiler(track_memory)
+    return _ACTIVE
+
+
+def finish(args: argparse.Namespace) -> None:
+    """Stop the profiler started for --profile, print the report and write --profile-json."""
+    global _ACTIVE
+    prof, _ACTIVE = _ACTIVE, None
+    if prof is None:
+        return
+    prof.stop()
+    prof.print_report(args.profile_top)
+    if args.profile_json:
+        out = Path(args.profile_json).expanduser().resolve()
+        prof.write_json(out, args.profile_top)
+        print("OK:", out)
+
+
+def add_profile_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--profile", action="store_true",
+                    help="Print wall time and allocations per phase and the slowest/largest input files")
+    ap.add_argument("--profile-top", type=int, default=10, help="Files to list with --profile (default: 10)")
+    ap.add_argument("--profile-json", default="", help="Also write the --profile metrics as JSON")
+    ap.add_argument("--profile-no-memory", action="store_true",
+                    help="--profile without tracemalloc (timings closer to a normal run)")
+
+
+def start_from_args(args: argparse.Namespace) -> Optional[Profiler]:
+    if not (args.profile or args.profile_json):
+        return None
+    return start(track_memory=not args.profile_no_memory)
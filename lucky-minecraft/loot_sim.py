@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# COMMAND FOR START:
+#   python .\loot_sim.py simulate --csv ".\summary.csv" --n 10000000
+#   python .\loot_sim.py simulate --csv ".\summary.csv" --config ".\loot.json" --table "village:chests/house_gun/tacz/ak47"
+#   python .\loot_sim.py simulate --datapack ".\lwi_loot_datapack" --table "village:chests/house"
+#   python .\loot_sim.py exact --csv ".\summary.csv" --cache ".\loot_exact_cache.json" --json ".\drops.json"
+
+"""
+Balance helper for the generated loot tables.
+
+  simulate   open N chests (Monte Carlo, NumPy batched sampling): per-item drop rates,
+             guns per chest, ammo per gun.
+  exact      the same numbers computed exactly, plus the full count distribution of every
+             item (pure Python, per-pool results cached by hash; for CI balance checks).
+
+Tables come either from summary.csv / the SQLite catalog (built in memory exactly like
+make_datapack.py does, with --config applied), or from a generated datapack folder.
+minecraft:loot_table entries are followed, so variant tables include their base table.
+Supported: rolls (constant or min/max), entry weights, set_count (constant or min/max).
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # only simulate needs it
+    np = None
+
+import make_datapack as mdp
+
+
+# -----------------------------
+# Loot table model
+# -----------------------------
+
+ItemKey = Tuple[str, str]   # (kind, id): ("gun", "tacz:ak47"), ("item", "minecraft:bread"), ...
+
+_RE_TACZ_ID = re.compile(r'(GunId|AmmoId|AttachmentId):"([^"]*)"')
+_TACZ_KINDS = {"GunId": "gun", "AmmoId": "ammo", "AttachmentId": "attachment"}
+
+
+class Entry(NamedTuple):
+    weight: int
+    item: Optional[ItemKey]        # None => nested loot table
+    count: Tuple[int, int]
+    table: str = ""
+
+
+class Pool(NamedTuple):
+    rolls: Tuple[int, int]
+    entries: Tuple[Entry, ...]
+
+
+def _int_range(value: Any) -> Tuple[int, int]:
+    """1 / 1.0 / {"min": 1, "max": 3} / {"type": "minecraft:uniform", ...} -> (min, max)."""
+    if isinstance(value, dict):
+        return int(value.get("min", 0)), int(value.get("max", value.get("min", 0)))
+    return int(value), int(value)
+
+
+def item_key(entry: Dict[str, Any]) -> ItemKey:
+    for fn in entry.get("functions") or []:
+        if str(fn.get("function", "")).endswith("set_nbt"):
+            m = _RE_TACZ_ID.search(str(fn.get("tag", "")))
+            if m:
+                return _TACZ_KINDS[m.group(1)], m.group(2)
+    return "item", str(entry.get("name", ""))
+
+
+def compile_pools(table: Dict[str, Any]) -> List[Pool]:
+    pools: List[Pool] = []
+    for pool in table.get("pools") or []:
+        entries: List[Entry] = []
+        for e in pool.get("entries") or []:
+            etype = str(e.get("type", "minecraft:item"))
+            weight = int(e.get("weight", 1))
+            if etype.endswith("loot_table"):
+                entries.append(Entry(weight, None, (1, 1), str(e.get("name", ""))))
+            elif etype.endswith("item"):
+                count = (1, 1)
+                for fn in e.get("functions") or []:
+                    if str(fn.get("function", "")).endswith("set_count"):
+                        count = _int_range(fn.get("count", 1))
+                entries.append(Entry(weight, item_key(e), count))
+            # empty / tag / alternatives entries are not generated by make_datapack
+        pools.append(Pool(_int_range(pool.get("rolls", 1)), tuple(entries)))
+    return pools
+
+
+class TableSource:
+    """Loot table name ("ns:chests/house") -> compiled pools; in-memory tables or a datapack folder."""
+
+    def __init__(self, tables: Optional[Dict[str, Dict]] = None, datapack: Optional[Path] = None):
+        self.tables = dict(tables or {})
+        self.datapack = datapack
+        self._pools: Dict[str, List[Pool]] = {}
+
+    def pools(self, name: str) -> List[Pool]:
+        if name not in self._pools:
+            table = self.tables.get(name)
+            if table is None and self.datapack is not None:
+                ns, _, path = name.partition(":")
+                fp = self.datapack / "data" / ns / "loot_tables" / f"{path}.json"
+                if fp.is_file():
+                    table = json.loads(fp.read_text(encoding="utf-8-sig"))
+            if table is None:
+                raise ValueError(f"Loot table not found: {name}")
+            self._pools[name] = compile_pools(table)
+        return self._pools[name]
+
+    def items(self, name: str, _seen: Optional[set] = None) -> List[ItemKey]:
+        """All items reachable from a table, in first-seen order."""
+        seen = _seen if _seen is not None else set()
+        if name in seen:
+            raise ValueError(f"Loot table cycle through {name}")
+        seen.add(name)
+        out: Dict[ItemKey, None] = {}
+        for pool in self.pools(name):
+            for e in pool.entries:
+                if e.item is not None:
+                    out[e.item] = None
+                else:
+                    out.update(dict.fromkeys(self.items(e.table, seen)))
+        seen.discard(name)
+        return list(out)
+
+
+def _table_name(rel: str) -> str:
+    """data/<ns>/loot_tables/<path>.json -> <ns>:<path>"""
+    parts = rel.split("/")
+    return f"{parts[1]}:{'/'.join(parts[3:])[:-len('.json')]}"
+
+
+def load_source(args: argparse.Namespace) -> Tuple[TableSource, str, Dict[str, str]]:
+    """(tables, name of the table to open, gun -> ammo id when known)."""
+    if args.datapack:
+        datapack = Path(args.datapack).expanduser().resolve()
+        table = args.table or f"{mdp.DEFAULT_NAMESPACE}:chests/house"
+        return TableSource(datapack=datapack), table, {}
+
+    if args.config:
+        mdp.apply_config(mdp.load_config(Path(args.config).expanduser().resolve()))
+    if args.catalog:
+        catalog = mdp.read_summary_sqlite(Path(args.catalog).expanduser().resolve())
+    else:
+        catalog = mdp.read_summary_csv(Path(args.csv).expanduser().resolve())
+
+    # same options make_datapack.py would see without CLI overrides
+    dp_args = argparse.Namespace(namespace=None, ak_id=None, ak_house_index=None,
+                                 house_override=[], attachments=None, minify=True)
+    files = mdp.build_loot_files(dp_args, catalog)
+    tables = {_table_name(rel): json.loads(text) for rel, text in files.items()}
+    table = args.table or f"{mdp.datapack_namespace(dp_args)}:chests/house"
+    return TableSource(tables), table, catalog.gun_to_ammo
+
+
+# -----------------------------
+# simulate: Monte Carlo
+# -----------------------------
+
+LOOKUP_MAX_WEIGHT = 1 << 16   # pools up to this total weight pick entries by a table lookup, not searchsorted
+SEEN_MAX_CELLS = 1 << 24       # chests x items of the per-batch presence matrix (bools: 16 MiB)
+
+
+class _CompiledPool(NamedTuple):
+    rolls: Tuple[int, int]
+    cum_weights: Any        # np.ndarray, cumulative entry weights
+    lookup: Any             # entry index per weight unit (None when the total weight is large)
+    item_idx: Any           # np.ndarray, item index per entry (-1 = nested table)
+    count_min: Any
+    count_span: Any         # max - min + 1
+    nested: Tuple[Tuple[int, str], ...]
+
+
+def _compile_for_numpy(source: TableSource, root: str, index: Dict[ItemKey, int]) -> Dict[str, List[_CompiledPool]]:
+    out: Dict[str, List[_CompiledPool]] = {}
+    todo = [root]
+    while todo:
+        name = todo.pop()
+        if name in out:
+            continue
+        pools = []
+        for pool in source.pools(name):
+            if not pool.entries:
+                continue
+            weights = np.array([max(0, e.weight) for e in pool.entries], dtype=np.int64)
+            pools.append(_CompiledPool(
+                rolls=pool.rolls,
+                cum_weights=np.cumsum(weights).astype(np.float64),
+                lookup=(np.repeat(np.arange(len(weights)), weights)
+                        if weights.sum() <= LOOKUP_MAX_WEIGHT else None),
+                item_idx=np.array([index[e.item] if e.item is not None else -1 for e in pool.entries]),
+                count_min=np.array([e.count[0] for e in pool.entries], dtype=np.int64),
+                count_span=np.array([max(1, e.count[1] - e.count[0] + 1) for e in pool.entries], dtype=np.int64),
+                nested=tuple((i, e.table) for i, e in enumerate(pool.entries) if e.item is None),
+            ))
+            todo += [t for _i, t in pools[-1].nested]
+        out[name] = pools
+    return out
+
+
+def _sample_table(rng, compiled: Dict[str, List[_CompiledPool]], name: str, calls, out: List) -> None:
+    """
+    Roll table `name` once for every chest index in `calls` (vectorized over all calls).
+    Appends (chest index, item index, count) arrays to out.
+    """
+    for pool in compiled[name]:
+        if len(calls) == 0:
+            return
+        lo, hi = pool.rolls
+        if lo == hi:
+            rep = np.repeat(calls, max(0, lo))
+        else:
+            rep = np.repeat(calls, rng.integers(lo, hi + 1, size=len(calls)))
+        if len(rep) == 0 or pool.cum_weights[-1] <= 0:
+            continue
+        if pool.lookup is not None:
+            pick = pool.lookup[rng.integers(0, len(pool.lookup), size=len(rep))]
+        else:
+            pick = np.searchsorted(pool.cum_weights, rng.random(len(rep)) * pool.cum_weights[-1], side="right")
+        item = pool.item_idx[pick]
+        is_item = item >= 0
+        if is_item.all():
+            counts = pool.count_min[pick] + (rng.random(len(pick)) * pool.count_span[pick]).astype(np.int64)
+            out.append((rep, item, counts))
+        else:
+            p = pick[is_item]
+            counts = pool.count_min[p] + (rng.random(len(p)) * pool.count_span[p]).astype(np.int64)
+            out.append((rep[is_item], item[is_item], counts))
+            for entry_i, table in pool.nested:
+                _sample_table(rng, compiled, table, rep[pick == entry_i], out)
+
+
+def simulate(source: TableSource, root: str, n: int, batch: int = 100_000, seed: int = 1) -> Dict[str, Any]:
+    if np is None:
+        raise SystemExit("simulate needs NumPy: pip install numpy")
+
+    items = source.items(root)
+    index = {k: i for i, k in enumerate(items)}
+    compiled = _compile_for_numpy(source, root, index)
+    kinds = np.array([k[0] for k in items])
+    is_gun = kinds == "gun"
+    is_ammo = kinds == "ammo"
+    n_items = len(items)
+
+    rng = np.random.default_rng(seed)
+    present = np.zeros(n_items, dtype=np.int64)       # chests with >= 1 of the item
+    total = np.zeros(n_items, dtype=np.float64)       # sum of counts
+    guns_hist = np.zeros(1, dtype=np.int64)           # chests by number of guns
+
+    # the presence matrix is batch x catalog: big catalogs get smaller batches, not more memory
+    batch = max(1, min(batch, SEEN_MAX_CELLS // max(1, n_items)))
+    done = 0
+    while done < n:
+        b = min(batch, n - done)
+        out: List = []
+        _sample_table(rng, compiled, root, np.arange(b, dtype=np.int64), out)
+        if out:
+            chest = np.concatenate([o[0] for o in out])
+            item = np.concatenate([o[1] for o in out])
+            count = np.concatenate([o[2] for o in out])
+        else:
+            chest = item = count = np.zeros(0, dtype=np.int64)
+
+        total += np.bincount(item, weights=count, minlength=n_items)
+        seen = np.zeros((b, n_items), dtype=bool)   # np.unique on chest*I+item is ~10x slower
+        dropped = count > 0                        # set_count can roll 0: nothing drops
+        seen[chest[dropped], item[dropped]] = True
+        present += seen.sum(axis=0)
+        gun_mask = is_gun[item]
+        per_chest = np.bincount(chest[gun_mask], weights=count[gun_mask], minlength=b).astype(np.int64)
+        hist = np.bincount(per_chest)
+        if len(hist) > len(guns_hist):
+            guns_hist = np.pad(guns_hist, (0, len(hist) - len(guns_hist)))
+        guns_hist[:len(hist)] += hist
+        done += b
+
+    guns = float(total[is_gun].sum())
+    return {
+        "table": root,
+        "chests": n,
+        "items": [
+            {"kind": k[0], "id": k[1], "drop_rate": present[i] / n, "mean_count": total[i] / n}
+            for i, k in enumerate(items)
+        ],
+        "guns_per_chest": guns / n,
+        "guns_histogram": [int(c) / n for c in guns_hist],
+        "ammo_per_chest": float(total[is_ammo].sum()) / n,
+        "ammo_per_gun": float(total[is_ammo].sum()) / guns if guns else None,
+    }
+
+
+# -----------------------------
+# exact: analytic distributions
+# -----------------------------
+
+Dist = Tuple[float, ...]                 # P(count == k), k = 0..len-1
+GROUP_KINDS = ("gun", "ammo")            # also computed as totals: (kind, "*")
+EXACT_CACHE_VERSION = 1
+
+
+def convolve(a: Dist, b: Dist) -> Dist:
+    if len(a) < len(b):
+        a, b = b, a
+    out = [0.0] * (len(a) + len(b) - 1)
+    for j, pb in enumerate(b):
+        if pb:
+            for i, pa in enumerate(a):
+                out[i + j] += pa * pb
+    return tuple(out)
+
+
+def _add_uniform(dist: Dist, lo: int, hi: int) -> Dist:
+    """dist * U[lo, hi] (sum with a uniform count) in O(len) via a running window sum."""
+    width = hi - lo + 1
+    out = [0.0] * (len(dist) + hi)
+    window = 0.0
+    for k in range(len(dist) + hi - lo):
+        if k < len(dist):
+            window += dist[k]
+        if k >= width:
+            window -= dist[k - width]
+        out[k + lo] = window / width
+    return tuple(out)
+
+
+_UNIFORM_POWERS: Dict[Tuple[int, int], List[Dist]] = {}
+
+
+def uniform_power(lo: int, hi: int, m: int) -> Dist:
+    """Distribution of the sum of m independent U[lo, hi] counts (shared by all entries with that range)."""
+    powers = _UNIFORM_POWERS.setdefault((lo, hi), [(1.0,)])
+    while len(powers) <= m:
+        powers.append(_add_uniform(powers[-1], lo, hi))
+    return powers[m]
+
+
+def _mix(parts: List[Tuple[float, Dist]]) -> Dist:
+    out = [0.0] * max((len(d) for _w, d in parts), default=1)
+    for w, d in parts:
+        for k, p in enumerate(d):
+            out[k] += w * p
+    return tuple(out)
+
+
+def _rolls_binomial(rolls: Tuple[int, int], p: float) -> List[float]:
+    """w[m] = P(entry picked exactly m times) when each roll picks it with probability p."""
+    lo, hi = rolls
+    w = [0.0] * (hi + 1)
+    for r in range(max(0, lo), hi + 1):
+        for m in range(r + 1):
+            w[m] += math.comb(r, m) * p ** m * (1 - p) ** (r - m) / (hi - lo + 1)
+    return w
+
+
+def _trim(dist: Dist) -> Dist:
+    end = len(dist)
+    while end > 1 and dist[end - 1] == 0.0:
+        end -= 1
+    return dist[:end]
+
+
+class ExactCalculator:
+    """
+    Exact count distribution of every item for one opening of a table.
+
+    A pool's result is cached under a hash of the pool itself (rolls, weights, counts and
+    the hashes of nested tables), so after a config change only the changed pools are
+    recomputed; with --cache the pool results are kept between runs.
+    """
+
+    def __init__(self, source: TableSource, cache_path: Optional[Path] = None):
+        self.source = source
+        self.cache_path = cache_path
+        self.pool_cache: Dict[str, Dict[str, Dist]] = {}
+        self.used: set = set()
+        self.computed = 0
+        self.reused = 0
+        self._table_hash: Dict[str, str] = {}
+        self._table_dists: Dict[str, Dict[ItemKey, Dist]] = {}
+
+    # cache file
+    def load(self) -> None:
+        if self.cache_path is None or not self.cache_path.is_file():
+            return
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == EXACT_CACHE_VERSION:
+            self.pool_cache = {h: {k: tuple(d) for k, d in pool.items()} for h, pool in data.get("pools", {}).items()}
+
+    def save(self) -> None:
+        if self.cache_path is None:
+            return
+        pools = {h: self.pool_cache[h] for h in sorted(self.used)}   # drop pools that no longer exist
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_path.write_text(json.dumps({"version": EXACT_CACHE_VERSION, "pools": pools},
+                                              separators=(",", ":")), encoding="utf-8")
+
+    # hashing
+    def table_hash(self, name: str, _seen: Optional[set] = None) -> str:
+        if name not in self._table_hash:
+            seen = _seen if _seen is not None else set()
+            if name in seen:
+                raise ValueError(f"Loot table cycle through {name}")
+            seen.add(name)
+            h = hashlib.sha1(name.encode("utf-8"))
+            for i in range(len(self.source.pools(name))):
+                h.update(self.pool_hash(name, i, seen).encode("ascii"))
+            seen.discard(name)
+            self._table_hash[name] = h.hexdigest()
+        return self._table_hash[name]
+
+    def pool_hash(self, name: str, i: int, _seen: Optional[set] = None) -> str:
+        pool = self.source.pools(name)[i]
+        nested = [self.table_hash(e.table, _seen) for e in pool.entries if e.item is None]
+        return hashlib.sha1(repr((GROUP_KINDS, pool, nested)).encode("utf-8")).hexdigest()
+
+    # distributions
+    def _pool_dists(self, pool: Pool) -> Dict[ItemKey, Dist]:
+        total = sum(max(0, e.weight) for e in pool.entries)
+        if total <= 0:
+            return {}
+        # key -> per-roll components: (probability, count range) or (probability, nested dist)
+        ranges: Dict[ItemKey, Dict[Tuple[int, int], float]] = {}
+        nested: Dict[ItemKey, List[Tuple[float, Dist]]] = {}
+        for e in pool.entries:
+            p = max(0, e.weight) / total
+            if not p:
+                continue
+            if e.item is not None:
+                keys = [e.item] + [(e.item[0], "*")] * (e.item[0] in GROUP_KINDS)
+                for key in keys:
+                    r = ranges.setdefault(key, {})
+                    r[e.count] = r.get(e.count, 0.0) + p
+            else:
+                for key, d in self.dists(e.table).items():
+                    nested.setdefault(key, []).append((p, d))
+
+        out: Dict[ItemKey, Dist] = {}
+        for key in ranges.keys() | nested.keys():
+            comps = ranges.get(key, {})
+            if len(comps) == 1 and key not in nested:
+                # one count range: number of picks is binomial per roll count, no generic convolution
+                (count, p), = comps.items()
+                w = _rolls_binomial(pool.rolls, p)
+                out[key] = _trim(_mix([(wm, uniform_power(count[0], count[1], m)) for m, wm in enumerate(w) if wm]))
+                continue
+            parts = [(p, uniform_power(c[0], c[1], 1)) for c, p in comps.items()] + nested.get(key, [])
+            per_roll = list(_mix(parts))
+            per_roll[0] += 1.0 - sum(p for p, _d in parts)
+            per_roll_t = tuple(per_roll)
+            lo, hi = pool.rolls
+            power: Dist = (1.0,)              # per_roll convolved r times
+            acc: List[Tuple[float, Dist]] = []
+            for r in range(hi + 1):
+                if r:
+                    power = convolve(power, per_roll_t)
+                if r >= lo:
+                    acc.append((1.0 / (hi - lo + 1), power))
+            out[key] = _trim(_mix(acc))
+        return out
+
+    def dists(self, name: str) -> Dict[ItemKey, Dist]:
+        """key -> count distribution for one opening of table `name`; keys missing from the result never drop."""
+        if name in self._table_dists:
+            return self._table_dists[name]
+        out: Dict[ItemKey, Dist] = {}
+        for i, pool in enumerate(self.source.pools(name)):
+            h = self.pool_hash(name, i)
+            self.used.add(h)
+            if h in self.pool_cache:
+                self.reused += 1
+                pool_dists = {_split_key(k): d for k, d in self.pool_cache[h].items()}
+            else:
+                self.computed += 1
+                pool_dists = self._pool_dists(pool)
+                self.pool_cache[h] = {_join_key(k): d for k, d in pool_dists.items()}
+            for key, d in pool_dists.items():
+                out[key] = convolve(out[key], d) if key in out else d
+        self._table_dists[name] = out
+        return out
+
+
+def _join_key(key: ItemKey) -> str:
+    return f"{key[0]}\t{key[1]}"
+
+
+def _split_key(text: str) -> ItemKey:
+    kind, _, item = text.partition("\t")
+    return kind, item
+
+
+def _mean(dist: Dist) -> float:
+    return sum(k * p for k, p in enumerate(dist))
+
+
+def exact(calc: ExactCalculator, root: str) -> Dict[str, Any]:
+    """Same shape as simulate() (chests = None), plus the full count distribution of every item."""
+    dists = calc.dists(root)
+    guns = dists.get(("gun", "*"), (1.0,))
+    ammo = dists.get(("ammo", "*"), (1.0,))
+    items = [k for k in calc.source.items(root) if k in dists]
+    return {
+        "table": root,
+        "chests": None,
+        "items": [
+            {"kind": k[0], "id": k[1], "drop_rate": 1.0 - dists[k][0], "mean_count": _mean(dists[k]),
+             "distribution": list(dists[k])}
+            for k in items
+        ],
+        "guns_per_chest": _mean(guns),
+        "guns_histogram": list(guns),
+        "ammo_per_chest": _mean(ammo),
+        "ammo_per_gun": _mean(ammo) / _mean(guns) if _mean(guns) else None,
+    }
+
+
+# -----------------------------
+# Report
+# -----------------------------
+
+def ammo_ratios(result: Dict[str, Any], gun_to_ammo: Dict[str, str]) -> List[Tuple[str, float, float]]:
+    """(ammo id, rounds per chest, guns using it per chest) for every ammo with guns in the table."""
+    rounds = {it["id"]: it["mean_count"] for it in result["items"] if it["kind"] == "ammo"}
+    guns: Dict[str, float] = {}
+    for it in result["items"]:
+        ammo = gun_to_ammo.get(it["id"]) if it["kind"] == "gun" else None
+        if ammo:
+            guns[ammo] = guns.get(ammo, 0.0) + it["mean_count"]
+    return sorted((a, rounds.get(a, 0.0), g) for a, g in guns.items())
+
+
+def print_result(result: Dict[str, Any], top: int, gun_to_ammo: Dict[str, str]) -> None:
+    chests = f"chests: {result['chests']:,}" if result["chests"] is not None else "exact"
+    print(f"Table: {result['table']}, {chests}")
+    print(f"Guns per chest: {result['guns_per_chest']:.3f}   "
+          + "  ".join(f"P({i})={p:.3f}" for i, p in enumerate(result["guns_histogram"])))
+    ratio = result["ammo_per_gun"]
+    print(f"Ammo per chest: {result['ammo_per_chest']:.2f}   ammo per gun: "
+          + (f"{ratio:.2f}" if ratio is not None else "-"))
+
+    items = sorted(result["items"], key=lambda it: (-it["drop_rate"], it["kind"], it["id"]))
+    print()
+    print(f"{'kind':11} {'id':44} {'drop %':>8} {'mean count':>11}")
+    for it in items[:top] if top > 0 else items:
+        print(f"{it['kind']:11} {it['id']:44} {it['drop_rate'] * 100:8.3f} {it['mean_count']:11.4f}")
+    if 0 < top < len(items):
+        print(f"... {len(items) - top} more (--top 0 for all)")
+
+    ratios = ammo_ratios(result, gun_to_ammo)
+    if ratios:
+        print()
+        print(f"{'ammo':32} {'rounds/chest':>13} {'guns/chest':>11} {'rounds/gun':>11}")
+        for ammo, r, g in ratios:
+            print(f"{ammo:32} {r:13.3f} {g:11.4f} {r / g if g else 0:11.1f}")
+
+
+def cmd_simulate(args: argparse.Namespace) -> None:
+    source, table, gun_to_ammo = load_source(args)
+    t0 = time.perf_counter()
+    result = simulate(source, table, args.n, args.batch, args.seed)
+    elapsed = time.perf_counter() - t0
+    print_result(result, args.top, gun_to_ammo)
+    print(f"\n{args.n:,} chests in {elapsed:.2f} s")
+    if args.json:
+        out = Path(args.json).expanduser().resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print("OK:", out)
+
+
+def cmd_exact(args: argparse.Namespace) -> None:
+    source, table, gun_to_ammo = load_source(args)
+    calc = ExactCalculator(source, Path(args.cache).expanduser().resolve() if args.cache else None)
+    calc.load()
+    t0 = time.perf_counter()
+    result = exact(calc, table)
+    elapsed = time.perf_counter() - t0
+    calc.save()
+    print_result(result, args.top, gun_to_ammo)
+    print(f"\n{calc.computed} pool(s) computed, {calc.reused} from cache, {elapsed * 1000:.0f} ms")
+    if args.json:
+        out = Path(args.json).expanduser().resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print("OK:", out)
+
+
+def add_source_args(ap: argparse.ArgumentParser) -> None:
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--csv", default="", help="summary.csv (tables are built like make_datapack.py does)")
+    src.add_argument("--catalog", default="", help="SQLite catalog (tacz_build_summary.py --sqlite)")
+    src.add_argument("--datapack", default="", help="Generated datapack folder")
+    ap.add_argument("--config", default="", help="make_datapack.py --config JSON (with --csv / --catalog)")
+    ap.add_argument("--table", default="", help="Loot table to open (default: <ns>:chests/house)")
+    ap.add_argument("--top", type=int, default=40, help="Items to list, by drop rate (0 = all)")
+    ap.add_argument("--json", default="", help="Also write the results as JSON")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Drop rates of the generated loot tables.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("simulate", help="Monte Carlo: open N chests (needs NumPy)")
+    add_source_args(p)
+    p.add_argument("--n", type=int, default=1_000_000, help="Chests to open (default: 1000000)")
+    p.add_argument("--batch", type=int, default=100_000, help="Chests per vectorized batch (lowered for big catalogs, see SEEN_MAX_CELLS)")
+    p.add_argument("--seed", type=int, default=1)
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser("exact", help="Exact drop probabilities and count distributions")
+    add_source_args(p)
+    p.add_argument("--cache", default="", help="Keep pool distributions here between runs (JSON)")
+    p.set_defaults(func=cmd_exact)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
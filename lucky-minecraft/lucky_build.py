@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# COMMAND FOR START:
+#   python .\lucky_build.py --root "C:\Users\me\AppData\Roaming\.minecraft\tacz" --out ".\lwi_loot_datapack" --summary ".\summary.csv" --watch
+
+"""
+Scan TaCZ packs and generate the loot datapack in one go
+(tacz_build_summary.py + make_datapack.py, without the summary.csv round trip).
+
+Rows stream from the scanners through de-dup (first pack wins, like --stream) into
+typed catalog records (make_datapack.GunRecord / AmmoRecord / AttachmentRecord), so
+nothing is converted to text and guessed back. --summary is only a side output of
+the same stream.
+
+With --watch it keeps running and polls the pack roots, --config and --dest-csv:
+  - only the changed pack files are re-parsed (the scan cache stays in memory),
+  - loot tables are rebuilt only when the catalog or the config changed,
+    .mcfunction files only when the config or the destinations changed,
+  - an output file is rewritten only when its content hash changed (DatapackWriter).
+Ctrl+C stops it (and saves --cache, if given).
+"""
+
+import argparse
+import os
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import make_datapack as mdp
+import tacz_build_summary as tbs
+
+
+# -----------------------------
+# Change detection (polling, no extra dependencies)
+# -----------------------------
+
+def _walk_signatures(path: Path, out: Dict[str, Tuple[int, int]]) -> None:
+    try:
+        it = os.scandir(path)
+    except NotADirectoryError:
+        try:
+            st = path.stat()
+        except OSError:
+            return
+        out[str(path)] = (st.st_mtime_ns, st.st_size)
+        return
+    except OSError:
+        return
+    with it:
+        for e in it:
+            try:
+                if e.is_dir():
+                    _walk_signatures(Path(e.path), out)
+                    continue
+                st = e.stat()
+            except OSError:   # gone between scandir and stat (an editor's temp file + rename)
+                continue
+            out[e.path] = (st.st_mtime_ns, st.st_size)
+
+
+def snapshot(paths: List[Path]) -> Dict[str, Tuple[int, int]]:
+    """path -> (mtime_ns, size) of every file under/at paths."""
+    out: Dict[str, Tuple[int, int]] = {}
+    for p in paths:
+        _walk_signatures(p, out)
+    return out
+
+
+def changed_paths(old: Dict[str, Tuple[int, int]], new: Dict[str, Tuple[int, int]]) -> Set[str]:
+    return {p for p in old.keys() | new.keys() if old.get(p) != new.get(p)}
+
+
+# -----------------------------
+# Incremental builder
+# -----------------------------
+
+class LuckyBuilder:
+    """
+    Keeps the catalog (make_datapack.Catalog) and the generated files in memory,
+    so a rebuild after a change only redoes the parts that depend on it.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.roots = [Path(r).expanduser().resolve() for r in args.root]
+        self.out_root = Path(args.out).expanduser().resolve()
+        self.summary = Path(args.summary).expanduser().resolve() if args.summary else None
+        self.config = Path(args.config).expanduser().resolve() if args.config else None
+        self.dest_csv = (Path(args.dest_csv).expanduser().resolve()
+                         if getattr(args, "dest_csv", "") else None)
+
+        # without --summary only make_datapack's columns are needed: attachment data files stay closed
+        self.opts = tbs.ScanOptions(columns=() if self.summary else tbs.COLUMN_PRESETS["datapack"])
+        cache_path = Path(args.cache).expanduser().resolve() if args.cache else Path(os.devnull)
+        self.cache = tbs.ScanCache(cache_path, opts=self.opts)
+        if args.cache:
+            self.cache.load()
+
+        self.catalog: Optional[mdp.Catalog] = None
+        self.function_files: Dict[str, Union[str, bytes]] = {}
+        self.loot_files: Dict[str, str] = {}
+        self.errors: List[str] = []
+        self.unwritten = False   # the last write_outputs() failed: redo it on the next rebuild
+
+    def watched_paths(self) -> List[Path]:
+        return self.roots + [p for p in (self.config, self.dest_csv) if p is not None]
+
+    def scan(self) -> mdp.Catalog:
+        """packs -> rows -> unique rows (-> summary.csv) -> catalog records -> Catalog, in one pass."""
+        errors: List[str] = []
+        packs: List[tbs.PackRoot] = []
+        for root in self.roots:
+            found = tbs.discover_pack_roots(root, self.args.pack_namespace.strip())
+            if not found:
+                errors.append(f"No TaCZ pack found in: {root}")
+            packs += found
+        summary = tbs.CsvStreamWriter(self.summary, self.opts.columns) if self.summary is not None else None
+        try:
+            data_index = tbs.DataFileIndex(packs)
+            rows = tbs.iter_unique_rows((r for pack in packs
+                                         for r in tbs.iter_pack_rows(pack, errors, self.cache, None, self.opts,
+                                                                     data_index=data_index)), errors)
+            if summary is not None:
+                rows = tbs.tee_rows(rows, summary.add)
+            catalog = mdp.collect_catalog(mdp.records_from_rows(rows))
+        finally:
+            if summary is not None:
+                summary.close()
+            tbs.close_archives()   # a rewritten zip has to be re-opened on the next scan
+        self.errors = errors
+        return catalog
+
+    def write_outputs(self) -> List[str]:
+        with mdp.open_writer(self.out_root) as writer:
+            mdp.write_files(writer, self.function_files)
+            mdp.write_files(writer, self.loot_files)
+        return writer.written + [f"{rel} (deleted)" for rel in writer.deleted]
+
+    def rebuild(self, changed: Optional[Set[str]] = None) -> List[str]:
+        """changed: paths reported by the watcher (None = first build, everything is dirty)."""
+        config_dirty = changed is None or (self.config is not None and str(self.config) in changed)
+        dests_dirty = config_dirty or (self.dest_csv is not None and str(self.dest_csv) in changed)
+        extra = {str(p) for p in (self.config, self.dest_csv) if p is not None}
+        scan_dirty = changed is None or bool(changed - extra)
+
+        if config_dirty and self.config is not None:
+            mdp.apply_config(mdp.load_config(self.config))
+
+        written: List[str] = []
+        catalog_dirty = False
+        if scan_dirty:
+            catalog = self.scan()
+            if self.summary is not None:
+                written.append(str(self.summary))
+            catalog_dirty = catalog != self.catalog
+            self.catalog = catalog
+
+        if dests_dirty:
+            self.function_files = mdp.build_function_files(self.args, mdp.resolve_dests(self.args))
+        if (catalog_dirty or config_dirty) and self.catalog is not None:
+            self.loot_files = mdp.build_loot_files(self.args, self.catalog)
+        if dests_dirty or catalog_dirty or config_dirty or self.unwritten:
+            # unchanged files are skipped by their content hash, see make_datapack.DatapackWriter
+            self.unwritten = True
+            written += self.write_outputs()
+            self.unwritten = False
+        return written
+
+    def save_cache(self) -> None:
+        if self.args.cache:
+            self.cache.save()
+
+
+def _report(builder: LuckyBuilder, written: List[str], t0: float, hits: int, misses: int) -> None:
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"[{time.strftime('%H:%M:%S')}] {ms:.0f} ms: parsed {builder.cache.misses - misses}, "
+          f"reused {builder.cache.hits - hits}, wrote {len(written)} file(s)")
+    for rel in written:
+        print("   ", rel)
+    for line in builder.errors[:15]:
+        print("   !", line)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Scan TaCZ packs and build the loot datapack (optionally on every change).")
+    ap.add_argument("--root", required=True, nargs="+",
+                    help="TaCZ pack root(s), same as tacz_build_summary.py --root")
+    ap.add_argument("--pack-namespace", default="",
+                    help="Namespace for gun ids when it can't be taken from a data/<ns> folder (default: auto)")
+    ap.add_argument("--summary", default="", help="Also write summary.csv here")
+    ap.add_argument("--cache", default="", help="Optional scan cache file (loaded on start, saved on exit)")
+    ap.add_argument("--watch", action="store_true", help="Keep running and rebuild on changes")
+    ap.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds (default: 0.5)")
+    mdp.add_datapack_args(ap)
+    args = ap.parse_args()
+
+    builder = LuckyBuilder(args)
+    t0, hits, misses = time.perf_counter(), 0, 0
+    try:
+        written = builder.rebuild()
+    except ValueError as e:
+        raise SystemExit(str(e))
+    _report(builder, written, t0, hits, misses)
+
+    if not args.watch:
+        builder.save_cache()
+        return
+
+    print("Watching", ", ".join(str(p) for p in builder.watched_paths()), "(Ctrl+C to stop)")
+    state = snapshot(builder.watched_paths())
+    retry: Set[str] = set()   # changes of a rebuild that failed on I/O, redone on the next poll
+    try:
+        while True:
+            time.sleep(args.interval)
+            new_state = snapshot(builder.watched_paths())
+            changed = changed_paths(state, new_state) | retry
+            if not changed:
+                continue
+            state, retry = new_state, set()
+            t0, hits, misses = time.perf_counter(), builder.cache.hits, builder.cache.misses
+            try:
+                written = builder.rebuild(changed)
+            except (OSError, zipfile.BadZipFile) as e:
+                # a file or zip still being written (or renamed away): try again on the next poll
+                print(f"[{time.strftime('%H:%M:%S')}] build failed, retrying: {e}")
+                retry = changed
+                continue
+            except ValueError as e:   # broken config / no guns: keep watching, the next save may fix it
+                print(f"[{time.strftime('%H:%M:%S')}] build failed: {e}")
+                continue
+            _report(builder, written, t0, hits, misses)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        builder.save_cache()
+
+
+if __name__ == "__main__":
+    main()
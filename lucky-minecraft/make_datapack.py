@@ -2,12 +2,25 @@
 # -*- coding: utf-8 -*-
 # COMMAND FOR START:
 #   python .\make_datapack.py --csv ".\summary.csv" --out ".\lwi_loot_datapack"
+#   python .\make_datapack.py --catalog ".\catalog.db" --out ".\lwi_loot_datapack"
+#   python .\make_datapack.py --csv ".\summary.csv" --out ".\world\datapacks\lwi_loot.zip" --minify
 
 import argparse
 import csv
+import filecmp
+import hashlib
 import json
+import math
+import random
+import sqlite3
+import sys
+import zipfile
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple, Optional, Union
+
+import build_profile
+import voxel_build
+from build_profile import phase
 
 # ============================================================
 # MOBS
@@ -17,6 +30,12 @@ SPAWN_AROUND_CHESTS = True
 SPAWN_RADIUS_MIN = 5
 SPAWN_RADIUS_MAX = 20
 
+# "markers": summon markers, spreadplayers them around the chest, summon mobs at the markers.
+# "offsets": ring positions computed here (seeded => same output every build), mobs summoned
+#            directly - no temporary entities and no @e selectors.
+SPAWN_MODE = "markers"
+SPAWN_SEED = 1
+
 # сколько и каких мобов на каждый сундук
 MOBS_PER_CHEST = [
     ("minecraft:zombie", 2, '{PersistenceRequired:1b}'),
@@ -37,6 +56,20 @@ CAR_FORWARD_OFFSET = 5  # сколько блоков впереди игрок
 # ============================================================
 # CAR END
 # ============================================================
+# ============================================================
+# STRUCTURES (data/<ns>/structures/*.nbt + one-line place functions)
+# ============================================================
+
+# car.nbt + place_car, loot_chest.nbt (chest with the house loot table) + place_loot_chest
+ENABLE_STRUCTURES = True
+STRUCTURE_DATA_VERSION = 3465  # Minecraft 1.20.1
+# more templates from voxel_build.py models: name -> model file (.txt / .json), e.g.
+#   {"loot_house": "models/loot_house.txt"}  (chests: C = minecraft:chest{LootTable:"village:chests/house"})
+STRUCTURE_MODELS: Dict[str, str] = {}
+
+# ============================================================
+# STRUCTURES END
+# ============================================================
 
 # Minecraft datapack format
 PACK_FORMAT = 15  # Minecraft 1.20.1
@@ -67,6 +100,36 @@ VILLAGE_CHEST_DESTS: List[Tuple[int, int, int]] = [
 # Optional: allow overriding destinations via CSV (--dest-csv)
 ENABLE_DEST_CSV_OVERRIDE = True
 
+# --- PLACEMENT
+# "staging": fill_village fills the staging row, update_chests clones the chests into the houses
+#            Clones with the same offset whose staging chests are on adjacent blocks are merged
+#            into region clones; that needs STAGING_STEP_X = 1 (with the default 2 every chest
+#            is cloned on its own).
+# "direct":  fill_village places the chests and sets their LootTable right at the destinations
+#            (no staging row, no update_chests).
+PLACEMENT_MODE = "staging"
+
+# --- CHUNK LOADING (update_chests / spawn_mobs)
+# Chests are visited tile by tile (FORCELOAD_TILE_CHUNKS x FORCELOAD_TILE_CHUNKS chunks; tiles grouped
+# by region file, serpentine order), so only one tile's chunks are loaded at a time.
+# ENABLE_FORCELOAD: force-load each tile's chunks (the staging row once, for the whole job), run the
+# tile FORCELOAD_WAIT_TICKS later, release the chunks the next tile does not need.
+# NOTE: with it fill_village (direct) / update_chests / spawn_mobs become multi-tick background jobs
+# (like SCHEDULE_COMMANDS_PER_TICK > 0), and chunks inside a tile that were force-loaded before
+# the job are released by it too. Off: everything runs in one tick, chunks must be loaded already.
+# Chests whose chunk is still not loaded are reported in chat.
+ENABLE_FORCELOAD = False
+FORCELOAD_TILE_CHUNKS = 4
+FORCELOAD_WAIT_TICKS = 2
+
+# --- TICK SCHEDULER (spread fill_village / update_chests / spawn_mobs over several ticks)
+# 0 = each function does all of its work in one tick (old behaviour).
+# N > 0 = at most N commands per tick: /function <ns>:<name> starts the job,
+# /function <ns>:<name>_cancel stops it, progress (commands done) is in the scoreboard below.
+# NOTE: the job then runs in the background => start update_chests only after fill_village is done.
+SCHEDULE_COMMANDS_PER_TICK = 0
+SCHEDULE_OBJECTIVE = "lwi_progress"
+
 # --- LOOT SETTINGS
 # Gun weights (relative chance inside gun pool)
 WEIGHT_PISTOL = 10
@@ -97,10 +160,24 @@ AMMO_STACK_FALLBACK_IF_MISSING = 36
 # Attachments weight
 WEIGHT_ATTACHMENT = 1
 
+# Attachments:
+#   "any":        one chest pool with every attachment, whatever gun dropped (old behaviour)
+#   "compatible": a gun drops together with a roll (ROLLS_ATTACHMENTS) of the attachments its
+#                 data file allows (allow_attachment_types); guns allowing the same types share
+#                 one sub-table, chests/gun_kit/<types> -> chests/attachments/<types>.
+#                 Guns without that data get any attachment. Needs a summary scanned with
+#                 allow_attachment_types (tacz_build_summary.py, default columns).
+ATTACHMENT_MODE = "any"
+
 # Guaranteed AK in one house loot table
 DEFAULT_AK_ID = "tacz:ak47"
 DEFAULT_AK_HOUSE_INDEX = 3  # 0-based
 
+# More guaranteed guns: 0-based house index -> gun id (plus --house-override INDEX=GUN).
+# Every house uses the shared base table; a house listed here gets a small variant table
+# (one per gun, shared by all houses with that gun) = base table + that gun.
+HOUSE_OVERRIDES: Dict[int, str] = {}
+
 # Default fire modes if not found in CSV
 DEFAULT_FIREMODE_PISTOL = "SEMI"
 DEFAULT_FIREMODE_SHOTGUN = "SEMI"
@@ -127,6 +204,95 @@ RESOURCES_ENTRIES = [
 # END CONFIG
 # ============================================================
 
+# Any UPPER_CASE setting above can be overridden from a JSON file (--config), e.g.
+#   {"WEIGHT_RIFLE": 3, "ROLLS_GUNS": [1, 3], "VILLAGE_CHEST_DESTS": [[241, 65, 471]]}
+_CONFIG_DEFAULTS = {k: v for k, v in globals().items() if k.isupper()}
+
+
+def _like(default, value):
+    """JSON value -> the shape of the default (lists back to tuples where needed)."""
+    if isinstance(default, tuple):
+        return tuple(value)
+    if isinstance(default, list) and default and isinstance(default[0], tuple):
+        return [tuple(v) for v in value]
+    return value
+
+
+def apply_config(overrides: Dict) -> None:
+    """Reset all settings to their defaults, then apply overrides (may be called again on reload)."""
+    unknown = sorted(set(overrides) - set(_CONFIG_DEFAULTS))
+    if unknown:
+        raise ValueError("Unknown config keys: " + ", ".join(unknown))
+    globals().update(_CONFIG_DEFAULTS)
+    for k, v in overrides.items():
+        globals()[k] = _like(_CONFIG_DEFAULTS[k], v)
+
+
+def load_config(path: Path) -> Dict:
+    obj = json.loads(path.read_text(encoding="utf-8-sig"))
+    if not isinstance(obj, dict):
+        raise ValueError(f"{path.name}: expected a JSON object")
+    return obj
+
+
+
+# Car model for voxel_build.py: layers bottom to top, first row = front, "_" = air.
+# The whole 5x5x8 box is cleared first, then the blocks are placed as merged fills.
+CAR_MODEL = """
+B = minecraft:black_concrete
+R = minecraft:red_concrete
+S = minecraft:sea_lantern
+L = minecraft:redstone_lamp
+G = minecraft:glass
+W = minecraft:gray_wool
+C = minecraft:light_gray_concrete
+origin = 2 0 1
+_____
+_____
+_BCB_
+_RRR_
+_RRR_
+_RRR_
+_B_B_
+_____
+---
+_____
+_____
+_SRS_
+_R_R_
+_RWR_
+_R_R_
+_LRL_
+_____
+---
+_____
+_____
+_GGG_
+_G_G_
+_G_G_
+_G_G_
+_GGG_
+_____
+---
+_____
+_____
+_____
+_RRR_
+_RRR_
+_RRR_
+_____
+_____
+---
+_____
+_____
+_____
+_____
+_____
+_____
+_____
+_____
+"""
+
 
 def build_car_function(forward_offset: int = 5) -> str:
     p = f"execute rotated as @s positioned ^ ^ ^{int(forward_offset)} run "
@@ -134,71 +300,186 @@ def build_car_function(forward_offset: int = 5) -> str:
         "# Build a small car in front of you (aligned to facing)",
         "# Run: /function village:build_car",
         "",
-        p + "fill ^-2 ^0 ^-1 ^2 ^4 ^6 minecraft:air replace",
-        "",
-        p + "setblock ^-1 ^0 ^0 minecraft:black_concrete",
-        p + "setblock ^1 ^0 ^0 minecraft:black_concrete",
-        p + "setblock ^-1 ^0 ^4 minecraft:black_concrete",
-        p + "setblock ^1 ^0 ^4 minecraft:black_concrete",
-        "",
-        p + "fill ^-1 ^0 ^1 ^1 ^0 ^3 minecraft:red_concrete",
-        p + "fill ^-1 ^1 ^1 ^-1 ^1 ^3 minecraft:red_concrete",
-        p + "fill ^1 ^1 ^1 ^1 ^1 ^3 minecraft:red_concrete",
-        p + "fill ^-1 ^1 ^0 ^1 ^1 ^0 minecraft:red_concrete",
-        p + "fill ^-1 ^1 ^4 ^1 ^1 ^4 minecraft:red_concrete",
-        "",
-        p + "setblock ^-1 ^1 ^4 minecraft:sea_lantern",
-        p + "setblock ^1 ^1 ^4 minecraft:sea_lantern",
-        p + "setblock ^-1 ^1 ^0 minecraft:redstone_lamp",
-        p + "setblock ^1 ^1 ^0 minecraft:redstone_lamp",
-        "",
-        p + "fill ^-1 ^2 ^1 ^-1 ^2 ^3 minecraft:glass",
-        p + "fill ^1 ^2 ^1 ^1 ^2 ^3 minecraft:glass",
-        p + "fill ^-1 ^2 ^4 ^1 ^2 ^4 minecraft:glass",
-        p + "fill ^-1 ^2 ^0 ^1 ^2 ^0 minecraft:glass",
-        "",
-        p + "fill ^-1 ^3 ^1 ^1 ^3 ^3 minecraft:red_concrete",
-        p + "setblock ^0 ^1 ^2 minecraft:gray_wool",
-        p + "setblock ^0 ^0 ^4 minecraft:light_gray_concrete",
-        "",
     ]
+    lines += voxel_build.compile_model(voxel_build.parse_text_model(CAR_MODEL), prefix=p)
     return "\n".join(lines).strip() + "\n"
 
-def build_car_function(forward_offset: int = 5) -> str:
-    p = f"execute rotated as @s positioned ^ ^ ^{int(forward_offset)} run "
-    lines = [
-        "# Build a small car in front of you (aligned to facing)",
-        "# Run: /function village:build_car",
-        "",
-        p + "fill ^-2 ^0 ^-1 ^2 ^4 ^6 minecraft:air replace",
-        "",
-        p + "setblock ^-1 ^0 ^0 minecraft:black_concrete",
-        p + "setblock ^1 ^0 ^0 minecraft:black_concrete",
-        p + "setblock ^-1 ^0 ^4 minecraft:black_concrete",
-        p + "setblock ^1 ^0 ^4 minecraft:black_concrete",
-        "",
-        p + "fill ^-1 ^0 ^1 ^1 ^0 ^3 minecraft:red_concrete",
-        p + "fill ^-1 ^1 ^1 ^-1 ^1 ^3 minecraft:red_concrete",
-        p + "fill ^1 ^1 ^1 ^1 ^1 ^3 minecraft:red_concrete",
-        p + "fill ^-1 ^1 ^0 ^1 ^1 ^0 minecraft:red_concrete",
-        p + "fill ^-1 ^1 ^4 ^1 ^1 ^4 minecraft:red_concrete",
-        "",
-        p + "setblock ^-1 ^1 ^4 minecraft:sea_lantern",
-        p + "setblock ^1 ^1 ^4 minecraft:sea_lantern",
-        p + "setblock ^-1 ^1 ^0 minecraft:redstone_lamp",
-        p + "setblock ^1 ^1 ^0 minecraft:redstone_lamp",
-        "",
-        p + "fill ^-1 ^2 ^1 ^-1 ^2 ^3 minecraft:glass",
-        p + "fill ^1 ^2 ^1 ^1 ^2 ^3 minecraft:glass",
-        p + "fill ^-1 ^2 ^4 ^1 ^2 ^4 minecraft:glass",
-        p + "fill ^-1 ^2 ^0 ^1 ^2 ^0 minecraft:glass",
-        "",
-        p + "fill ^-1 ^3 ^1 ^1 ^3 ^3 minecraft:red_concrete",
-        p + "setblock ^0 ^1 ^2 minecraft:gray_wool",
-        p + "setblock ^0 ^0 ^4 minecraft:light_gray_concrete",
-        "",
+
+# Line "#wait N" inside a generated function: the following commands run N ticks later
+# (schedule_function splits there). Without scheduling it is a plain comment.
+WAIT_MARKER = "#wait"
+
+
+def chunk_of(x: int, z: int) -> Tuple[int, int]:
+    return x >> 4, z >> 4
+
+
+def _serpentine(cells: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Row by row (z), every other row backwards => neighbours stay next to each other."""
+    return sorted(set(cells), key=lambda c: (c[1], c[0] if c[1] % 2 == 0 else -c[0]))
+
+
+def plan_chunk_tiles(chunks: List[Tuple[int, int]], tile: int) -> List[List[int]]:
+    """
+    Indices of chunks grouped into tiles of tile x tile chunks, in visiting order:
+    region files (32x32 chunks) in serpentine order, tiles inside a region the same way.
+    """
+    tile = max(1, tile)
+    groups: Dict[Tuple[int, int], List[int]] = {}
+    for i, (cx, cz) in enumerate(chunks):
+        groups.setdefault((cx // tile, cz // tile), []).append(i)
+
+    by_region: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    for tx, tz in groups:
+        by_region.setdefault(((tx * tile) >> 5, (tz * tile) >> 5), []).append((tx, tz))
+
+    out: List[List[int]] = []
+    for region in _serpentine(by_region):
+        for t in _serpentine(by_region[region]):
+            out.append(sorted(groups[t], key=lambda i: (chunks[i][1], chunks[i][0], i)))
+    return out
+
+
+def chunk_rects(chunks: Iterable[Tuple[int, int]]) -> List[Tuple[int, int, int, int]]:
+    """Cover exactly these chunks with few (cx1, cz1, cx2, cz2) rectangles: x runs per row, stacked when equal."""
+    rows: Dict[int, List[int]] = {}
+    for cx, cz in set(chunks):
+        rows.setdefault(cz, []).append(cx)
+
+    done: List[List[int]] = []
+    open_runs: Dict[Tuple[int, int], List[int]] = {}
+    for cz in sorted(rows):
+        xs = sorted(rows[cz])
+        runs: List[Tuple[int, int]] = []
+        start = prev = xs[0]
+        for x in xs[1:]:
+            if x != prev + 1:
+                runs.append((start, prev))
+                start = x
+            prev = x
+        runs.append((start, prev))
+
+        still_open: Dict[Tuple[int, int], List[int]] = {}
+        for run in runs:
+            rect = open_runs.pop(run, None)
+            if rect is not None and rect[3] == cz - 1:
+                rect[3] = cz
+            else:
+                if rect is not None:
+                    done.append(rect)
+                rect = [run[0], cz, run[1], cz]
+            still_open[run] = rect
+        done += open_runs.values()
+        open_runs = still_open
+    done += open_runs.values()
+    return [tuple(r) for r in sorted(done, key=lambda r: (r[1], r[0]))]
+
+
+FORCELOAD_MAX_CHUNKS = 256   # vanilla refuses a forceload rectangle of more chunks
+
+
+def _split_rect(x1: int, z1: int, x2: int, z2: int) -> Iterator[Tuple[int, int, int, int]]:
+    """A chunk rectangle in pieces of at most FORCELOAD_MAX_CHUNKS chunks."""
+    for sx in range(x1, x2 + 1, FORCELOAD_MAX_CHUNKS):
+        ex = min(x2, sx + FORCELOAD_MAX_CHUNKS - 1)
+        step = max(1, FORCELOAD_MAX_CHUNKS // (ex - sx + 1))
+        for sz in range(z1, z2 + 1, step):
+            yield sx, sz, ex, min(z2, sz + step - 1)
+
+
+def forceload_commands(dimension: str, chunks: Iterable[Tuple[int, int]], action: str) -> List[str]:
+    """forceload add/remove covering exactly these chunks (one command per rectangle, block coords)."""
+    return [
+        f"execute in {dimension} run forceload {action} {x1 * 16} {z1 * 16} {x2 * 16 + 15} {z2 * 16 + 15}"
+        for rect in chunk_rects(chunks) for x1, z1, x2, z2 in _split_rect(*rect)
     ]
-    return "\n".join(lines).strip() + "\n"
+
+
+def chunk_tiled_lines(
+    dimension: str,
+    items: List[Tuple[Tuple[int, int], List[Tuple[int, int]], List[str]]],
+    forceload: bool,
+    tile: int = 4,
+    wait_ticks: int = 2,
+    shared: Iterable[Tuple[int, int]] = (),
+) -> List[str]:
+    """
+    items: (chunk used for ordering, chunks that must be loaded, commands) per chest.
+    shared: chunks every tile needs (the staging row), loaded with the first tile, released after the last.
+    Returns the commands tile by tile; with forceload each tile is wrapped in
+    forceload add (chunks not loaded yet) / #wait / ... / forceload remove (chunks the next tile
+    does not need), so a chunk two neighbouring tiles share stays loaded in between.
+    """
+    tiles = plan_chunk_tiles([it[0] for it in items], tile)
+    if not forceload:
+        return [ln for tile_items in tiles for i in tile_items for ln in items[i][2]]
+
+    shared = set(shared)
+    wanted = [{c for i in tile_items for c in items[i][1]} - shared for tile_items in tiles]
+    lines: List[str] = []
+    loaded: set = set()
+    for t, tile_items in enumerate(tiles):
+        add = wanted[t] - loaded
+        if t == 0:
+            add |= shared
+        if add:
+            lines += forceload_commands(dimension, add, "add")
+            lines.append(f"{WAIT_MARKER} {max(1, int(wait_ticks))}")
+        loaded |= add
+        for i in tile_items:
+            lines += items[i][2]
+        release = loaded - (wanted[t + 1] if t + 1 < len(tiles) else set()) - shared
+        if t + 1 == len(tiles):
+            release |= shared
+        lines += forceload_commands(dimension, release, "remove")
+        loaded -= release
+    return lines
+
+
+def _area_chunks(x: int, z: int, radius: int) -> List[Tuple[int, int]]:
+    cx1, cz1 = chunk_of(x - radius, z - radius)
+    cx2, cz2 = chunk_of(x + radius, z + radius)
+    return [(cx, cz) for cz in range(cz1, cz2 + 1) for cx in range(cx1, cx2 + 1)]
+
+
+def ring_offsets(rng: random.Random, count: int, rmin: int, rmax: int) -> List[Tuple[int, int]]:
+    """count (dx, dz) block offsets, uniform over the ring area rmin..rmax (not bunched in the middle)."""
+    out = []
+    for _ in range(count):
+        r = math.sqrt(rng.uniform(rmin * rmin, rmax * rmax))
+        a = rng.uniform(0.0, 2.0 * math.pi)
+        out.append((int(round(r * math.cos(a))), int(round(r * math.sin(a)))))
+    return out
+
+
+def block_center(v: int) -> str:
+    """
+    Center of block v on one axis (block v spans v .. v+1, also for negative v):
+
+    >>> block_center(4), block_center(-4), block_center(-1), block_center(-29999984)
+    ('4.5', '-3.5', '-0.5', '-29999983.5')
+    """
+    return str(v + 0.5)   # not :g, it switches to exponent notation past 6 digits
+
+
+def spawn_offset_commands(
+    x: int, y: int, z: int,
+    mobs_per_chest: List[Tuple[str, int, str]],
+    rmin: int, rmax: int,
+    dimension: str, seed: int,
+) -> List[str]:
+    """SPAWN_MODE = "offsets": one summon per mob on the surface at a precomputed ring position."""
+    # seeded per chest => a chest keeps its positions when other destinations change
+    rng = random.Random(f"{seed}:{x}:{y}:{z}")
+    lines = []
+    for mob_id, count, nbt in mobs_per_chest:
+        for ox, oz in ring_offsets(rng, int(count), rmin, rmax):
+            lines.append(
+                f"execute in {dimension} positioned {block_center(x + ox)} {y} {block_center(z + oz)} "
+                f"positioned over motion_blocking_no_leaves run summon {mob_id} ~ ~1 ~ {nbt}"
+            )
+    return lines
+
 
 def build_spawn_mobs_function(
     chest_coords: List[Tuple[int, int, int]],
@@ -206,28 +487,48 @@ def build_spawn_mobs_function(
     rmin: int,
     rmax: int,
     dimension: str = "minecraft:overworld",
+    forceload: bool = False,
+    tile_chunks: int = 4,
+    wait_ticks: int = 2,
+    mode: str = "markers",
+    seed: int = 0,
 ) -> str:
     lines: List[str] = []
     lines.append("# One-time spawn mobs around chests")
     lines.append("# Run: /function village:spawn_mobs")
-    lines.append("# WARNING: chunks must be loaded (destinations)!")
+    if forceload:
+        lines.append("# Chunks around the chests are force-loaded tile by tile (runs over several ticks).")
+    else:
+        lines.append("# WARNING: chunks must be loaded (destinations)!")
     lines.append("")
 
+    items = []
     for i, (x, y, z) in enumerate(chest_coords, start=1):
         tag = f"village_c{i}"
-        lines.append(f"# ---- Chest {i}: {x} {y} {z} ----")
+        chest: List[str] = []
+        chest.append(f"# ---- Chest {i}: {x} {y} {z} ----")
+        chest.append(
+            f'execute in {dimension} unless loaded {x} {y} {z} run tellraw @a '
+            f'{{"text":"[spawn_mobs] chest {i} at {x} {y} {z}: chunk not loaded, skipped"}}'
+        )
+
+        if mode == "offsets":
+            chest += spawn_offset_commands(x, y, z, mobs_per_chest, rmin, rmax, dimension, seed)
+            chest.append("")
+            items.append((chunk_of(x, z), _area_chunks(x, z, rmax), chest))
+            continue
 
         # summon markers at chest center, tagged by mob type
         for mob_id, count, _nbt in mobs_per_chest:
             mob_tag = "mob_" + mob_id.split(":", 1)[1]
             for _ in range(int(count)):
-                lines.append(
+                chest.append(
                     f'execute in {dimension} run summon minecraft:marker {x} {y} {z} '
                     f'{{Tags:["village_tmp","{tag}","{mob_tag}"]}}'
                 )
 
         # spread markers in ring 5..20 blocks
-        lines.append(
+        chest.append(
             f"execute in {dimension} run spreadplayers {x} {z} {rmin} {rmax} false "
             f"@e[type=minecraft:marker,tag=village_tmp,tag={tag}]"
         )
@@ -235,19 +536,21 @@ def build_spawn_mobs_function(
         # summon mobs at markers on top surface (reliable)
         for mob_id, _count, nbt in mobs_per_chest:
             mob_tag = "mob_" + mob_id.split(":", 1)[1]
-            lines.append(
+            chest.append(
                 f"execute in {dimension} as @e[type=minecraft:marker,tag=village_tmp,tag={tag},tag={mob_tag}] "
                 f"at @s positioned over motion_blocking_no_leaves "
                 f"run summon {mob_id} ~ ~1 ~ {nbt}"
             )
 
-        # cleanup markers within radius
-        lines.append(
-            f"execute in {dimension} run kill "
+        # cleanup markers within radius (around the chest, not the caller: may run scheduled)
+        chest.append(
+            f"execute in {dimension} positioned {x} {y} {z} run kill "
             f"@e[type=minecraft:marker,tag=village_tmp,tag={tag},distance=..{rmax + 10}]"
         )
-        lines.append("")
+        chest.append("")
+        items.append((chunk_of(x, z), _area_chunks(x, z, rmax), chest))
 
+    lines += chunk_tiled_lines(dimension, items, forceload, tile_chunks, wait_ticks)
     return "\n".join(lines).strip() + "\n"
 
 
@@ -297,15 +600,56 @@ def load_destinations_csv(path: Path) -> List[Tuple[int, int, int]]:
     return out
 
 
+def coalesce_clones(
+    pairs: List[Tuple[int, Tuple[int, int, int], Tuple[int, int, int]]],
+) -> List[Tuple[List[int], Tuple[int, int, int], Tuple[int, int, int], Tuple[int, int, int]]]:
+    """
+    pairs: (house index, source, destination) of single-block clones.
+    Returns (house indices, source from, source to, destination) region clones:
+    sources on adjacent blocks of one x row that move by the same offset become one clone.
+    Only gap-free runs are merged: a box with gaps would also copy whatever lies between the
+    staging chests (the row is usually underground: stone, dirt, ore), even with "masked".
+    """
+    rows: Dict[Tuple[int, int], List[Tuple[int, int, Tuple[int, int, int]]]] = {}
+    for i, (sx, sy, sz), (dx, dy, dz) in pairs:
+        rows.setdefault((sy, sz), []).append((sx, i, (dx - sx, dy - sy, dz - sz)))
+
+    out = []
+    for (sy, sz), row in rows.items():
+        row.sort()
+        run = [row[0]]
+        for item in row[1:] + [None]:
+            if item is not None and item[2] == run[-1][2] and item[0] == run[-1][0] + 1:
+                run.append(item)
+                continue
+            x1, x2 = run[0][0], run[-1][0]
+            off = run[0][2]
+            out.append(([r[1] for r in run], (x1, sy, sz), (x2, sy, sz),
+                        (x1 + off[0], sy + off[1], sz + off[2])))
+            if item is not None:
+                run = [item]
+    out.sort(key=lambda c: c[0][0])
+    return out
+
+
+def _chunk_points(x1: int, x2: int) -> List[int]:
+    """One x per chunk column between x1 and x2 (x1 itself first)."""
+    return [x1] + [cx * 16 for cx in range((x1 >> 4) + 1, (x2 >> 4) + 1)]
+
+
 def build_update_chests_function(
     base_x: int, y: int, z: int, houses: int, step_x: int,
     dests: List[Tuple[int, int, int]],
     dimension: str = "minecraft:overworld",
+    forceload: bool = False,
+    tile_chunks: int = 4,
+    wait_ticks: int = 2,
 ) -> str:
     lines = [
         "# Copy pre-generated chests from staging row into village houses",
         "# Run: /function village:update_chests",
-        "# WARNING: /clone needs chunks loaded for source and destination!",
+        "# Staging and destination chunks are force-loaded tile by tile (runs over several ticks)."
+        if forceload else "# WARNING: /clone needs chunks loaded for source and destination!",
         "",
     ]
 
@@ -314,84 +658,304 @@ def build_update_chests_function(
         lines.append("# No destinations/houses to process.")
         return "\n".join(lines) + "\n"
 
-    for i in range(n):
-        sx = base_x + i * step_x
-        dx, dy, dz = dests[i]
-        lines.append(
-            f"execute in {dimension} run clone {sx} {y} {z} {sx} {y} {z} {dx} {dy} {dz} replace"
-        )
-
+    pairs = [(i, (base_x + i * step_x, y, z), dests[i]) for i in range(n)]
+    items = []
+    for idx, (sx1, sy, sz), (sx2, _, _), (dx, dy, dz) in coalesce_clones(pairs):
+        dx2 = dx + sx2 - sx1
+        label = f"house {idx[0]}" if len(idx) == 1 else f"houses {idx[0]}..{idx[-1]}"
+        # one point per chunk the region touches, on both sides
+        points = [(px, dy, dz, "chunk") for px in _chunk_points(dx, dx2)]
+        points += [(px, sy, sz, "staging chunk") for px in _chunk_points(sx1, sx2)]
+        commands = [
+            f'execute in {dimension} unless loaded {px} {py} {pz} run tellraw @a '
+            f'{{"text":"[update_chests] {label}: {what} at {px} {py} {pz} not loaded, skipped"}}'
+            for px, py, pz, what in points
+        ]
+        commands.append(f"execute in {dimension} run clone {sx1} {sy} {sz} {sx2} {sy} {sz} {dx} {dy} {dz} replace")
+        needed = [chunk_of(px, pz) for px, _py, pz, _what in points]
+        items.append((chunk_of(dx, dz), needed, commands))
+
+    # the staging row is read by every tile: loaded once for the whole job
+    staging = {chunk_of(base_x + i * step_x, z) for i in range(n)}
+    lines += chunk_tiled_lines(dimension, items, forceload, tile_chunks, wait_ticks, shared=staging)
     lines.append("")
     return "\n".join(lines)
 
 
-def read_summary_csv(csv_path: Path) -> Tuple[List[Dict], Dict[str, int], List[str], Dict[str, str], Dict[str, str]]:
+def build_direct_fill_function(
+    houses: int,
+    dests: List[Tuple[int, int, int]],
+    normal_table: str, house_tables: Dict[int, str],
+    dimension: str = "minecraft:overworld",
+    forceload: bool = False,
+    tile_chunks: int = 4,
+    wait_ticks: int = 2,
+) -> str:
     """
-    Returns:
-      guns_rows: list of dict rows for index/guns
-      ammo_stack: ammo_id -> stack_size (int)
-      attachments_ids: list of attachment ids (index_id)
-      gun_to_ammo: gun_id -> ammo_id
-      gun_to_firemode: gun_id -> "AUTO"/"SEMI"/"BURST"/""
+    PLACEMENT_MODE = "direct": put the chests with their loot table straight into the houses.
+    "keep" leaves an existing chest (and its facing) alone; Items:[] empties it before the refill.
     """
-    guns_rows: List[Dict] = []
-    ammo_stack: Dict[str, int] = {}
-    attachments_ids: List[str] = []
-    gun_to_ammo: Dict[str, str] = {}
-    gun_to_firemode: Dict[str, str] = {}
+    lines = [
+        "# Place loot chests directly in the village houses (no staging row)",
+        "# Run: /function village:fill_village",
+        "# Destination chunks are force-loaded tile by tile (runs over several ticks)."
+        if forceload else "# WARNING: destination chunks must be loaded!",
+        "",
+    ]
 
-    with csv_path.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            src = (r.get("source") or "").strip()
-            cat = (r.get("category") or "").strip()
-            idx_id = (r.get("index_id") or "").strip()
-            if not idx_id:
-                continue
+    n = min(houses, len(dests))
+    if n <= 0:
+        lines.append("# No destinations/houses to process.")
+        return "\n".join(lines) + "\n"
 
-            if src == "index" and cat == "guns":
-                guns_rows.append(r)
+    items = []
+    for i in range(n):
+        x, y, z = dests[i]
+        table = house_tables.get(i, normal_table)
+        items.append((chunk_of(x, z), [chunk_of(x, z)], [
+            f'execute in {dimension} unless loaded {x} {y} {z} run tellraw @a '
+            f'{{"text":"[fill_village] house {i}: chunk at {x} {y} {z} not loaded, skipped"}}',
+            f"execute in {dimension} run setblock {x} {y} {z} minecraft:chest keep",
+            f'execute in {dimension} run data merge block {x} {y} {z} {{LootTable:"{table}",Items:[]}}',
+        ]))
+
+    lines += chunk_tiled_lines(dimension, items, forceload, tile_chunks, wait_ticks)
+    lines.append("")
+    return "\n".join(lines)
 
-                ga = (r.get("gun_ammo") or "").strip()
-                if ga:
-                    gun_to_ammo[idx_id] = ga
 
-                fm = (r.get("default_fire_mode") or "").strip()
-                if fm:
-                    gun_to_firemode[idx_id] = fm
+# Catalog records: the typed subset of a summary row the loot builder needs.
+# Scanner rows already carry native values; only CSV strings are converted here.
 
-            if src == "index" and cat == "ammo":
-                ss = (r.get("stack_size") or "").strip()
-                try:
-                    stack = int(float(ss)) if ss else 60
-                except Exception:
-                    stack = 60
-                ammo_stack[idx_id] = stack
+STACK_SIZE_FALLBACK = 60   # ammo with an empty/unparsable stack_size
+
+
+class GunRecord(NamedTuple):
+    index_id: str
+    type: str = ""
+    gun_ammo: str = ""
+    default_fire_mode: str = ""
+    allow_attachment_types: str = ""   # "scope|muzzle|..." from the gun data file, "" = unknown
 
-            if src == "index" and cat == "attachments":
-                attachments_ids.append(idx_id)
 
-    attachments_ids = sorted(set(attachments_ids))
-    return guns_rows, ammo_stack, attachments_ids, gun_to_ammo, gun_to_firemode
+class AmmoRecord(NamedTuple):
+    index_id: str
+    stack_size: int = STACK_SIZE_FALLBACK
 
 
-def filter_simple_guns(guns_rows: List[Dict]) -> Tuple[List[str], List[str], List[str]]:
-    pistols, shotguns, rifles = [], [], []
-    for r in guns_rows:
-        gun_id = (r.get("index_id") or "").strip()
-        gtype = (r.get("type") or "").strip().lower()
+class AttachmentRecord(NamedTuple):
+    index_id: str
+    type: str = ""
 
-        if not gun_id or not gtype:
+
+CatalogRecord = Union[GunRecord, AmmoRecord, AttachmentRecord]
+
+
+class Catalog:
+    """
+    Catalog records plus the indexes the builders query, all built in one pass.
+    Id lists are sorted, so generated tables do not depend on the scan order.
+
+      guns / ammo_stack / attachments   id -> record (stack size for ammo)
+      guns_by_type                      "pistol" -> [gun ids]
+      gun_to_ammo / guns_by_ammo        gun id -> ammo id, ammo id -> [gun ids]
+      gun_to_firemode                   gun id -> "AUTO"/"SEMI"/"BURST" (only when known)
+      attachments_by_type               "scope" -> [attachment ids]
+      attachment_type_bits              "scope" -> 1 << i (attachment types present in the catalog)
+      gun_attachment_mask               gun id -> OR of the bits of the types the gun accepts
+                                        (all_attachment_mask when the gun data did not say)
+    """
+
+    __slots__ = ("guns", "ammo_stack", "attachments", "guns_by_type", "gun_to_ammo", "guns_by_ammo",
+                 "gun_to_firemode", "attachments_by_type", "attachment_ids", "attachment_type_bits",
+                 "all_attachment_mask", "gun_attachment_mask", "_mask_attachments")
+
+    def __init__(self, guns: Dict[str, GunRecord], ammo_stack: Dict[str, int],
+                 attachments: Dict[str, AttachmentRecord]):
+        self.guns = guns
+        self.ammo_stack = ammo_stack
+        self.attachments = attachments
+        self.guns_by_type: Dict[str, List[str]] = {}
+        self.gun_to_ammo: Dict[str, str] = {}
+        self.guns_by_ammo: Dict[str, List[str]] = {}
+        self.gun_to_firemode: Dict[str, str] = {}
+        self.attachments_by_type: Dict[str, List[str]] = {}
+        self.gun_attachment_mask: Dict[str, int] = {}
+        self._mask_attachments: Dict[int, List[str]] = {}
+
+        self.attachment_ids = sorted(attachments)
+        for att_id in self.attachment_ids:
+            self.attachments_by_type.setdefault(attachments[att_id].type, []).append(att_id)
+        self.attachment_type_bits = {t: 1 << i for i, t in enumerate(sorted(self.attachments_by_type))}
+        self.all_attachment_mask = (1 << len(self.attachment_type_bits)) - 1
+
+        for gun_id in sorted(guns):
+            g = guns[gun_id]
+            if g.type:
+                self.guns_by_type.setdefault(g.type, []).append(gun_id)
+            if g.gun_ammo:
+                self.gun_to_ammo[gun_id] = g.gun_ammo
+                self.guns_by_ammo.setdefault(g.gun_ammo, []).append(gun_id)
+            if g.default_fire_mode:
+                self.gun_to_firemode[gun_id] = g.default_fire_mode
+            if g.allow_attachment_types:
+                bits = self.attachment_type_bits
+                self.gun_attachment_mask[gun_id] = sum(
+                    bits.get(t, 0) for t in set(g.allow_attachment_types.split("|")))
+            else:
+                self.gun_attachment_mask[gun_id] = self.all_attachment_mask
+
+    def guns_of_type(self, gun_type: str) -> List[str]:
+        return self.guns_by_type.get(gun_type, [])
+
+    def ammo_of_type(self, gun_type: str) -> List[str]:
+        """Sorted ammo ids used by guns of a type."""
+        return sorted({self.gun_to_ammo[g] for g in self.guns_of_type(gun_type) if g in self.gun_to_ammo})
+
+    def attachment_mask(self, gun_id: str) -> int:
+        """Accepted attachment types of a gun as a bitmask (guns not in the catalog accept all)."""
+        return self.gun_attachment_mask.get(gun_id, self.all_attachment_mask)
+
+    def mask_types(self, mask: int) -> List[str]:
+        return [t for t, bit in self.attachment_type_bits.items() if mask & bit]
+
+    def attachments_for_mask(self, mask: int) -> List[str]:
+        """Sorted attachment ids whose type is in the mask (one list per distinct mask)."""
+        out = self._mask_attachments.get(mask)
+        if out is None:
+            if mask == self.all_attachment_mask:
+                out = self.attachment_ids
+            else:
+                out = sorted(a for t in self.mask_types(mask) for a in self.attachments_by_type[t])
+            self._mask_attachments[mask] = out
+        return out
+
+    def __eq__(self, other: object) -> bool:
+        # the indexes are derived, comparing the records is enough
+        return (isinstance(other, Catalog) and self.guns == other.guns and self.ammo_stack == other.ammo_stack
+                and self.attachments == other.attachments)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Catalog({len(self.guns)} guns, {len(self.ammo_stack)} ammo, {len(self.attachments)} attachments)"
+
+
+def _interned(value) -> str:
+    return sys.intern(str(value or "").strip())
+
+
+def _stack_size(value) -> int:
+    if isinstance(value, int):
+        return value
+    ss = str(value or "").strip()
+    try:
+        return int(float(ss)) if ss else STACK_SIZE_FALLBACK
+    except (ValueError, OverflowError):
+        return STACK_SIZE_FALLBACK
+
+
+def records_from_rows(rows: Iterable[Dict]) -> Iterator[CatalogRecord]:
+    """
+    summary.csv rows, or rows straight from tacz_build_summary (values may be numbers)
+    -> catalog records, one per index row, as they arrive.
+    """
+    for r in rows:
+        if str(r.get("source") or "").strip() != "index":
+            continue
+        idx_id = str(r.get("index_id") or "").strip()
+        if not idx_id:
             continue
+        cat = str(r.get("category") or "").strip()
+        if cat == "guns":
+            # types / ammo ids / fire modes repeat a lot: one shared string each
+            yield GunRecord(idx_id, _interned(r.get("type")).lower(), _interned(r.get("gun_ammo")),
+                            _interned(r.get("default_fire_mode")), _interned(r.get("allow_attachment_types")))
+        elif cat == "ammo":
+            yield AmmoRecord(idx_id, _stack_size(r.get("stack_size")))
+        elif cat == "attachments":
+            yield AttachmentRecord(idx_id, _interned(r.get("type")).lower())
+
+
+def collect_catalog(records: Iterable[CatalogRecord]) -> Catalog:
+    """Fold records into a Catalog (the last record of an id wins)."""
+    guns: Dict[str, GunRecord] = {}
+    ammo_stack: Dict[str, int] = {}
+    attachments: Dict[str, AttachmentRecord] = {}
+    for rec in records:
+        if isinstance(rec, GunRecord):
+            guns[rec.index_id] = rec
+        elif isinstance(rec, AmmoRecord):
+            ammo_stack[rec.index_id] = rec.stack_size
+        else:
+            attachments[rec.index_id] = rec
+    return Catalog(guns, ammo_stack, attachments)
+
+
+def summary_lookups(rows: Iterable[Dict]) -> Catalog:
+    return collect_catalog(records_from_rows(rows))
+
+
+def read_summary_csv(csv_path: Path) -> Catalog:
+    """summary_lookups() of a summary.csv written by tacz_build_summary.py."""
+    with csv_path.open("r", encoding="utf-8", newline="") as f:
+        return summary_lookups(csv.DictReader(f))
+
 
-        if gtype == "pistol":
-            pistols.append(gun_id)
-        elif gtype == "shotgun":
-            shotguns.append(gun_id)
-        elif gtype == "rifle":
-            rifles.append(gun_id)
+def iter_sqlite_records(db_path: Path) -> Iterator[CatalogRecord]:
+    """Catalog records from the SQLite catalog written by tacz_build_summary.py --sqlite (typed columns)."""
+    conn = sqlite3.connect(f"file:{db_path.as_posix()}?mode=ro", uri=True)
+    try:
+        # catalogs written before allow_attachment_types existed: every gun accepts everything
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(items)")}
+        allow = "allow_attachment_types" if "allow_attachment_types" in columns else "''"
+        for idx_id, gtype, ga, fm, aat in conn.execute(
+            f"SELECT index_id, type, gun_ammo, default_fire_mode, {allow} FROM items "
+            "WHERE source = 'index' AND category = 'guns' ORDER BY rowid"
+        ):
+            yield GunRecord(idx_id, sys.intern((gtype or "").lower()), sys.intern(ga or ""), sys.intern(fm or ""),
+                            sys.intern(aat or ""))
+
+        for idx_id, stack in conn.execute(
+            "SELECT index_id, stack_size FROM items WHERE source = 'index' AND category = 'ammo' ORDER BY rowid"
+        ):
+            yield AmmoRecord(idx_id, stack if stack is not None else STACK_SIZE_FALLBACK)
+
+        for idx_id, atype in conn.execute(
+            "SELECT index_id, type FROM items WHERE source = 'index' AND category = 'attachments' ORDER BY rowid"
+        ):
+            yield AttachmentRecord(idx_id, sys.intern((atype or "").lower()))
+    finally:
+        conn.close()
+
+
+def read_summary_sqlite(db_path: Path) -> Catalog:
+    """Same result as read_summary_csv, from the SQLite catalog (indexed by category/type/ammo)."""
+    return collect_catalog(iter_sqlite_records(db_path))
+
+
+def find_guns(db_path: Path, gun_type: str = "", ammo_id: str = "") -> List[str]:
+    """
+    Indexed catalog lookup, e.g. find_guns(db, "shotgun", "tacz:12g") -> all shotguns using 12g.
+    Empty filters match everything.
+    """
+    sql = "SELECT index_id FROM items WHERE category = 'guns'"
+    params: List[str] = []
+    if gun_type:
+        sql += " AND type = ?"
+        params.append(gun_type.lower())
+    if ammo_id:
+        sql += " AND gun_ammo = ?"
+        params.append(ammo_id)
+    conn = sqlite3.connect(f"file:{db_path.as_posix()}?mode=ro", uri=True)
+    try:
+        return [r[0] for r in conn.execute(sql + " ORDER BY index_id", params)]
+    finally:
+        conn.close()
 
-    return sorted(set(pistols)), sorted(set(shotguns)), sorted(set(rifles))
+
+def filter_simple_guns(catalog: Catalog) -> Tuple[List[str], List[str], List[str]]:
+    return catalog.guns_of_type("pistol"), catalog.guns_of_type("shotgun"), catalog.guns_of_type("rifle")
 
 
 def gun_entry(gun_id: str, fire_mode: str = "", weight: int = 1) -> Dict:
@@ -437,9 +1001,11 @@ def attachment_entry(att_id: str, weight: int = 1) -> Dict:
     }
 
 
-def write_json(path: Path, obj: Dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+def json_text(obj: Dict, minify: bool = False) -> str:
+    with phase("json_dumps"):
+        if minify:
+            return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        return json.dumps(obj, ensure_ascii=False, indent=2)
 
 
 def _vanilla_item_entry(item_name: str, mn: int, mx: int) -> Dict:
@@ -450,6 +1016,67 @@ def _vanilla_item_entry(item_name: str, mn: int, mx: int) -> Dict:
     }
 
 
+def simple_gun_entries(
+    pistols: List[str], shotguns: List[str], rifles: List[str], gun_to_firemode: Dict[str, str],
+) -> List[Tuple[str, Dict]]:
+    """(gun id, gun pool entry) with the per-type weight and default fire mode."""
+    out: List[Tuple[str, Dict]] = []
+    for guns, weight, default_fm in ((pistols, WEIGHT_PISTOL, DEFAULT_FIREMODE_PISTOL),
+                                     (shotguns, WEIGHT_SHOTGUN, DEFAULT_FIREMODE_SHOTGUN),
+                                     (rifles, WEIGHT_RIFLE, DEFAULT_FIREMODE_RIFLE)):
+        for g in guns:
+            out.append((g, gun_entry(g, fire_mode=gun_to_firemode.get(g, default_fm), weight=weight)))
+    return out
+
+
+def attachments_table_path(catalog: Catalog, mask: int) -> str:
+    """chests/attachments/<type>-<type>... of an attachment-type mask ("all" = every type)."""
+    if mask == catalog.all_attachment_mask:
+        name = "all"
+    elif not mask:
+        name = "none"
+    else:
+        name = "-".join("".join(c if c.isascii() and (c.isalnum() or c in "_.") else "_" for c in t) or "untyped"
+                        for t in catalog.mask_types(mask))
+    return f"chests/attachments/{name}"
+
+
+def attachments_table(catalog: Catalog, mask: int) -> Dict:
+    return {"type": "minecraft:chest", "pools": [
+        {"rolls": {"min": ROLLS_ATTACHMENTS[0], "max": ROLLS_ATTACHMENTS[1]},
+         "entries": [attachment_entry(a, weight=WEIGHT_ATTACHMENT) for a in catalog.attachments_for_mask(mask)]},
+    ]}
+
+
+def build_gun_kits(ns: str, catalog: Catalog, gun_entries: List[Tuple[str, Dict]]) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """
+    ATTACHMENT_MODE "compatible". Loot pools roll independently, so "an attachment that fits
+    the gun that dropped" needs the gun and its attachment roll in one sub-table: guns are
+    grouped by attachment mask, each group becomes chests/gun_kit/<types> (one of the guns +
+    a roll of chests/attachments/<types>). The house gun pool references the kits with the
+    summed weight of their guns, so every gun keeps its chance.
+    Returns (gun pool entries, {table path inside the namespace: table}).
+    """
+    groups: Dict[int, List[Dict]] = {}
+    for gun_id, entry in gun_entries:
+        groups.setdefault(catalog.attachment_mask(gun_id), []).append(entry)
+
+    pool_entries: List[Dict] = []
+    tables: Dict[str, Dict] = {}
+    for mask in sorted(groups):
+        entries = groups[mask]
+        att_path = attachments_table_path(catalog, mask)
+        kit_path = "chests/gun_kit/" + att_path.rpartition("/")[2]
+        kit_pools = [{"rolls": 1, "entries": entries}]
+        if catalog.attachments_for_mask(mask):
+            tables[att_path] = attachments_table(catalog, mask)
+            kit_pools.append({"rolls": 1, "entries": [{"type": "minecraft:loot_table", "name": f"{ns}:{att_path}"}]})
+        tables[kit_path] = {"type": "minecraft:chest", "pools": kit_pools}
+        pool_entries.append({"type": "minecraft:loot_table", "name": f"{ns}:{kit_path}",
+                             "weight": sum(e["weight"] for e in entries)})
+    return pool_entries, tables
+
+
 def build_house_loot_table(
     pistols: List[str],
     shotguns: List[str],
@@ -459,25 +1086,26 @@ def build_house_loot_table(
     gun_to_ammo: Dict[str, str],
     gun_to_firemode: Dict[str, str],
     ak_id: Optional[str] = None,
+    shotgun_ammo_ids: Optional[List[str]] = None,
+    gun_entries: Optional[List[Dict]] = None,
 ) -> Dict:
+    """
+    gun_entries: entries of the gun pool (default: one item entry per gun, see simple_gun_entries).
+    An empty attachments list drops the attachment pool (ATTACHMENT_MODE "compatible":
+    the gun kits in gun_entries roll their own).
+    """
     supplies_entries = [_vanilla_item_entry(e["name"], e["min"], e["max"]) for e in SUPPLIES_ENTRIES]
     resources_entries = [_vanilla_item_entry(e["name"], e["min"], e["max"]) for e in RESOURCES_ENTRIES]
 
     # --- Guns
-    gun_entries: List[Dict] = []
-    for g in pistols:
-        fm = gun_to_firemode.get(g, DEFAULT_FIREMODE_PISTOL)
-        gun_entries.append(gun_entry(g, fire_mode=fm, weight=WEIGHT_PISTOL))
-    for g in shotguns:
-        fm = gun_to_firemode.get(g, DEFAULT_FIREMODE_SHOTGUN)
-        gun_entries.append(gun_entry(g, fire_mode=fm, weight=WEIGHT_SHOTGUN))
-    for g in rifles:
-        fm = gun_to_firemode.get(g, DEFAULT_FIREMODE_RIFLE)
-        gun_entries.append(gun_entry(g, fire_mode=fm, weight=WEIGHT_RIFLE))
+    if gun_entries is None:
+        gun_entries = [entry for _g, entry in simple_gun_entries(pistols, shotguns, rifles, gun_to_firemode)]
 
     # --- Ammo split: shotgun ammo vs general
-    shotgun_ammo_ids = sorted({gun_to_ammo.get(g, "") for g in shotguns if gun_to_ammo.get(g, "")})
-    other_ammo_ids = sorted(set(ammo_stack.keys()) - set(shotgun_ammo_ids))
+    if shotgun_ammo_ids is None:   # Catalog.ammo_of_type("shotgun")
+        shotgun_ammo_ids = sorted({gun_to_ammo.get(g, "") for g in shotguns if gun_to_ammo.get(g, "")})
+    shotgun_ammo = set(shotgun_ammo_ids)
+    other_ammo_ids = sorted(a for a in ammo_stack if a not in shotgun_ammo)
 
     shotgun_ammo_entries: List[Dict] = []
     if ENABLE_SHOTGUN_AMMO_POOL:
@@ -487,7 +1115,7 @@ def build_house_loot_table(
 
     ammo_entries: List[Dict] = []
     for ammo_id in other_ammo_ids:
-        ammo_entries.append(ammo_entry(ammo_id, ammo_stack.get(ammo_id, 60), weight=WEIGHT_AMMO_GENERAL))
+        ammo_entries.append(ammo_entry(ammo_id, ammo_stack.get(ammo_id, STACK_SIZE_FALLBACK), weight=WEIGHT_AMMO_GENERAL))
 
     # --- Attachments
     att_entries = [attachment_entry(a, weight=WEIGHT_ATTACHMENT) for a in attachments]
@@ -504,7 +1132,8 @@ def build_house_loot_table(
     if ammo_entries:
         pools.append({"rolls": {"min": ROLLS_AMMO_GENERAL[0], "max": ROLLS_AMMO_GENERAL[1]}, "entries": ammo_entries})
 
-    pools.append({"rolls": {"min": ROLLS_ATTACHMENTS[0], "max": ROLLS_ATTACHMENTS[1]}, "entries": att_entries})
+    if att_entries:
+        pools.append({"rolls": {"min": ROLLS_ATTACHMENTS[0], "max": ROLLS_ATTACHMENTS[1]}, "entries": att_entries})
 
     if ak_id:
         pools.insert(2, {
@@ -515,139 +1144,567 @@ def build_house_loot_table(
     return {"type": "minecraft:chest", "pools": pools}
 
 
+def variant_table_path(gun_id: str) -> str:
+    """Loot table path (inside the namespace) of the "base + guaranteed gun" variant."""
+    gun_ns, _, gun_path = gun_id.partition(":")
+    return f"chests/house_gun/{gun_ns}/{gun_path}" if gun_path else f"chests/house_gun/{gun_ns}"
+
+
+def build_variant_loot_table(base_table: str, gun_id: str, gun_to_firemode: Dict[str, str],
+                             attachments_table: str = "") -> Dict:
+    """All pools of base_table (referenced, not copied) + one guaranteed gun (+ its attachment roll)."""
+    pools = [
+        {"rolls": 1, "entries": [{"type": "minecraft:loot_table", "name": base_table}]},
+        {"rolls": 1, "entries": [
+            gun_entry(gun_id, fire_mode=gun_to_firemode.get(gun_id, DEFAULT_FIREMODE_RIFLE), weight=1)
+        ]},
+    ]
+    if attachments_table:
+        pools.append({"rolls": 1, "entries": [{"type": "minecraft:loot_table", "name": attachments_table}]})
+    return {"type": "minecraft:chest", "pools": pools}
+
+
 def build_fill_function(
     base_x: int, y: int, z: int, houses: int, step_x: int,
-    normal_table: str, ak_table: str, ak_house_index: int
+    normal_table: str, house_tables: Dict[int, str]
 ) -> str:
+    """house_tables: 0-based house index -> loot table, for houses not using normal_table."""
     lines: List[str] = []
     for i in range(houses):
         x = base_x + i * step_x
         lines.append(f"setblock {x} {y} {z} minecraft:chest")
-        table = ak_table if i == ak_house_index else normal_table
+        table = house_tables.get(i, normal_table)
         lines.append(f'data merge block {x} {y} {z} {{LootTable:"{table}"}}')
         lines.append("")
     return "\n".join(lines).strip() + "\n"
 
 
-def main():
-    ap = argparse.ArgumentParser(description="Generate Minecraft datapack from TaCZ summary.csv for loot chests.")
-    ap.add_argument("--csv", required=True, help="Path to summary.csv (from your scan)")
-    ap.add_argument("--out", required=True, help="Output datapack folder (will be created)")
-    ap.add_argument("--namespace", default=DEFAULT_NAMESPACE, help=f"Datapack namespace (default: {DEFAULT_NAMESPACE})")
+def schedule_function(ns: str, name: str, text: str, per_tick: int) -> Dict[str, str]:
+    """
+    Split a generated function into batches of per_tick commands, one batch per game tick.
+    A "#wait N" line (WAIT_MARKER) always ends a batch; the next one runs N ticks later.
+    Returns {path inside functions/: text}:
+      <name>            - leading comment block + start (clears pending batches, resets
+                          progress, runs batch 0)
+      <name>/batch_<i>  - commands (with the comments above them), progress update,
+                          schedule of the next batch
+      <name>/stop       - clears the pending batch, releases force-loaded chunks;
+                          <name>_cancel = stop + message
+    A text without waits and with no more than per_tick commands (or per_tick <= 0)
+    is returned unchanged.
+    """
+    lines = text.splitlines()
+    n_header = 0
+    while n_header < len(lines) and lines[n_header].lstrip().startswith("#") \
+            and not lines[n_header].strip().startswith(WAIT_MARKER + " "):
+        n_header += 1
+    header = lines[:n_header]
+
+    # segments of lines (commands + comments), each followed by a wait (ticks) before the next one
+    segments: List[Tuple[List[str], int]] = [([], 1)]
+    commands: List[str] = []
+    for ln in lines[n_header:]:
+        stripped = ln.strip()
+        if stripped.startswith(WAIT_MARKER + " "):
+            segments[-1] = (segments[-1][0], max(1, int(stripped.split()[1])))
+            segments.append(([], 1))
+        elif stripped:
+            segments[-1][0].append(ln)
+            if not stripped.startswith("#"):
+                commands.append(ln)
+    if len(segments) == 1 and (per_tick <= 0 or len(commands) <= per_tick):
+        return {f"{name}.mcfunction": text}
+
+    batches: List[Tuple[List[str], int]] = []
+    for seg, wait in segments:
+        # per_tick commands per chunk; a comment goes with the command below it
+        chunks: List[List[str]] = [[]]
+        count = 0
+        for ln in seg:
+            if per_tick > 0 and count == per_tick:
+                chunks.append([])
+                count = 0
+            chunks[-1].append(ln)
+            count += not ln.lstrip().startswith("#")
+        if len(chunks) > 1 and count == 0:   # trailing comments stay with the last commands
+            chunks[-2] += chunks.pop()
+        batches += [(c, 1) for c in chunks[:-1]] + [(chunks[-1], wait)]
+    # a wait with no commands before it only delays: fold such batches into the next one's delay
+    # (their comments move along)
+    merged: List[Tuple[List[str], int]] = []
+    delay = 0
+    carried: List[str] = []
+    for batch, wait in batches:
+        if all(ln.lstrip().startswith("#") for ln in batch):
+            delay += wait
+            carried += batch
+            continue
+        if merged:
+            merged[-1] = (merged[-1][0], merged[-1][1] + delay)
+        merged.append((carried + batch, wait))
+        delay = 0
+        carried = []
+    if carried and merged:
+        merged[-1] = (merged[-1][0] + carried, merged[-1][1])
+    batches = merged or [(carried, 1)]
+
+    obj = SCHEDULE_OBJECTIVE
+    files: Dict[str, str] = {}
+
+    # restart = drop the pending batch of a previous run; chunks stay as they are
+    # (a force-load an admin set up is not ours to remove, only _cancel releases the job's tiles)
+    clears = [f"schedule clear {ns}:{name}/batch_{i}" for i in range(1, len(batches))]
+    files[f"{name}.mcfunction"] = "\n".join(header + [
+        f"# Runs {len(commands)} commands in {len(batches)} batches"
+        + (f" ({per_tick} per tick)." if per_tick > 0 else "."),
+        f"# Progress: scoreboard {obj}, {name}. Cancel: /function {ns}:{name}_cancel",
+        "",
+    ] + clears + [
+        f"scoreboard objectives add {obj} dummy",
+        f"scoreboard players set {name} {obj} 0",
+        f'tellraw @a {{"text":"[{ns}] {name}: started, {len(commands)} commands"}}',
+        f"function {ns}:{name}/batch_0",
+    ]) + "\n"
+
+    for i, (batch, wait) in enumerate(batches):
+        n_commands = sum(1 for ln in batch if not ln.lstrip().startswith("#"))
+        tail = [f"scoreboard players add {name} {obj} {n_commands}"]
+        if i + 1 < len(batches):
+            tail.append(f"schedule function {ns}:{name}/batch_{i + 1} {wait}t")
+        else:
+            tail.append(f'tellraw @a {{"text":"[{ns}] {name}: done"}}')
+        files[f"{name}/batch_{i}.mcfunction"] = "\n".join(batch + tail) + "\n"
+
+    # only one batch is pending at a time, but which one is not known => clear them all;
+    # a cancelled job must not leave its chunks force-loaded
+    releases = list(dict.fromkeys(c for c in commands if " forceload remove " in c))
+    files[f"{name}/stop.mcfunction"] = "\n".join(clears + releases or ["# single batch"]) + "\n"
+    files[f"{name}_cancel.mcfunction"] = "\n".join([
+        f"function {ns}:{name}/stop",
+        f'tellraw @a {{"text":"[{ns}] {name}: cancelled"}}',
+    ]) + "\n"
+    return files
+
+
+def add_datapack_args(ap: argparse.ArgumentParser) -> None:
+    """Datapack options, shared with lucky_build.py. Unset options fall back to the (config) constants."""
+    ap.add_argument("--out", required=True,
+                    help="Output datapack folder (will be created), or a .zip to write the datapack as one archive")
+    ap.add_argument("--namespace", default=None, help=f"Datapack namespace (default: {DEFAULT_NAMESPACE})")
+    ap.add_argument("--minify", action="store_true", help="Write JSON without indentation")
+    ap.add_argument("--config", default="",
+                    help="Optional JSON file overriding the UPPER_CASE settings of make_datapack.py")
 
     # allow overriding staging row from CLI if needed
-    ap.add_argument("--base-x", type=int, default=STAGING_BASE_X)
-    ap.add_argument("--y", type=int, default=STAGING_Y)
-    ap.add_argument("--z", type=int, default=STAGING_Z)
-    ap.add_argument("--houses", type=int, default=STAGING_HOUSES)
-    ap.add_argument("--step-x", type=int, default=STAGING_STEP_X)
+    ap.add_argument("--base-x", type=int, default=None, help=f"(default: {STAGING_BASE_X})")
+    ap.add_argument("--y", type=int, default=None, help=f"(default: {STAGING_Y})")
+    ap.add_argument("--z", type=int, default=None, help=f"(default: {STAGING_Z})")
+    ap.add_argument("--houses", type=int, default=None, help=f"(default: {STAGING_HOUSES})")
+    ap.add_argument("--step-x", type=int, default=None,
+                    help=f"1 lets update_chests merge clones into region clones (default: {STAGING_STEP_X})")
 
     if ENABLE_DEST_CSV_OVERRIDE:
         ap.add_argument("--dest-csv", default="", help="Optional CSV with destination coords (x,y,z).")
 
-    ap.add_argument("--ak-id", default=DEFAULT_AK_ID, help=f"Gun id to guarantee once (default: {DEFAULT_AK_ID})")
-    ap.add_argument("--ak-house-index", type=int, default=DEFAULT_AK_HOUSE_INDEX,
+    ap.add_argument("--ak-id", default=None, help=f"Gun id to guarantee once (default: {DEFAULT_AK_ID})")
+    ap.add_argument("--ak-house-index", type=int, default=None,
                     help=f"0-based house index to contain guaranteed gun (default: {DEFAULT_AK_HOUSE_INDEX})")
-    
-
-
-    args = ap.parse_args()
-
-    csv_path = Path(args.csv).expanduser().resolve()
-    out_root = Path(args.out).expanduser().resolve()
-    ns = args.namespace.strip()
-
-    # destinations
+    ap.add_argument("--placement", choices=("staging", "direct"), default=None,
+                    help=f"staging = fill staging row + clone into houses, direct = place chests in the houses "
+                         f"(default: {PLACEMENT_MODE})")
+    ap.add_argument("--spawn-mode", choices=("markers", "offsets"), default=None,
+                    help=f"spawn_mobs: markers + spreadplayers, or precomputed offsets without entities "
+                         f"(default: {SPAWN_MODE})")
+    ap.add_argument("--per-tick", type=int, default=None,
+                    help=f"Run fill/update/spawn functions with at most N commands per tick, 0 = all at once "
+                         f"(default: {SCHEDULE_COMMANDS_PER_TICK})")
+    ap.add_argument("--house-override", action="append", default=[], metavar="INDEX=GUN",
+                    help="Guarantee a gun in one more house, e.g. 5=tacz:m4a1 (repeatable)")
+    ap.add_argument("--attachments", choices=("any", "compatible"), default=None,
+                    help=f"any = one attachment pool for the chest, compatible = attachments drop with a gun "
+                         f"that accepts them (default: {ATTACHMENT_MODE})")
+
+
+def _opt(value, default):
+    return default if value is None else value
+
+
+def datapack_namespace(args: argparse.Namespace) -> str:
+    return _opt(args.namespace, DEFAULT_NAMESPACE).strip()
+
+
+def house_overrides(args: argparse.Namespace) -> Dict[int, str]:
+    """0-based house index -> guaranteed gun id: HOUSE_OVERRIDES, then --ak-id, then --house-override."""
+    out = {int(i): str(g).strip() for i, g in HOUSE_OVERRIDES.items()}
+    ak_id = (_opt(args.ak_id, DEFAULT_AK_ID) or "").strip()
+    if ak_id:
+        out[_opt(args.ak_house_index, DEFAULT_AK_HOUSE_INDEX)] = ak_id
+    for item in getattr(args, "house_override", []):
+        idx, sep, gun_id = item.partition("=")
+        try:
+            out[int(idx)] = gun_id.strip()
+        except ValueError:
+            sep = ""
+        if not sep or not gun_id.strip():
+            raise ValueError(f"--house-override expects INDEX=GUN, got: {item}")
+    return {i: g for i, g in out.items() if g}
+
+
+def resolve_dests(args: argparse.Namespace) -> List[Tuple[int, int, int]]:
     dests = VILLAGE_CHEST_DESTS
     if ENABLE_DEST_CSV_OVERRIDE and getattr(args, "dest_csv", ""):
         loaded = load_destinations_csv(Path(args.dest_csv).expanduser().resolve())
         if loaded:
             dests = loaded
+    return dests
 
-    guns_rows, ammo_stack, attachments, gun_to_ammo, gun_to_firemode = read_summary_csv(csv_path)
-    pistols, shotguns, rifles = filter_simple_guns(guns_rows)
-
-    if not pistols and not shotguns and not rifles:
-        raise SystemExit("No simple guns found (pistol/shotgun/rifle) in summary.csv")
 
-    ak_id = (args.ak_id or "").strip() or None
+def build_loot_files(
+    args: argparse.Namespace,
+    catalog: Catalog,
+) -> Dict[str, str]:
+    """Loot tables, as {path inside the datapack: text}. Depends on the catalog and the loot settings."""
+    pistols, shotguns, rifles = filter_simple_guns(catalog)
 
-    # datapack structure
-    pack_dir = out_root
-    data_dir = pack_dir / "data" / ns
-    functions_dir = data_dir / "functions"
-    loot_dir = data_dir / "loot_tables" / "chests"
-    pack_dir.mkdir(parents=True, exist_ok=True)
+    if not pistols and not shotguns and not rifles:
+        raise ValueError("No simple guns found (pistol/shotgun/rifle)")
 
-    write_json(pack_dir / "pack.mcmeta", {
-        "pack": {"pack_format": PACK_FORMAT, "description": "LWI loot generator (auto)"}
-    })
+    minify = getattr(args, "minify", False)
+    ns = datapack_namespace(args)
+    loot_dir = f"data/{ns}/loot_tables"
+    compatible = _opt(getattr(args, "attachments", None), ATTACHMENT_MODE) == "compatible"
 
-    normal_table_name = f"{ns}:chests/house"
-    ak_table_name = f"{ns}:chests/house_ak"
+    kit_tables: Dict[str, Dict] = {}
+    gun_entries = None
+    if compatible:
+        gun_entries, kit_tables = build_gun_kits(
+            ns, catalog, simple_gun_entries(pistols, shotguns, rifles, catalog.gun_to_firemode))
 
     house_table = build_house_loot_table(
         pistols=pistols, shotguns=shotguns, rifles=rifles,
-        ammo_stack=ammo_stack, attachments=attachments,
-        gun_to_ammo=gun_to_ammo, gun_to_firemode=gun_to_firemode,
-        ak_id=None
-    )
-    house_ak_table = build_house_loot_table(
-        pistols=pistols, shotguns=shotguns, rifles=rifles,
-        ammo_stack=ammo_stack, attachments=attachments,
-        gun_to_ammo=gun_to_ammo, gun_to_firemode=gun_to_firemode,
-        ak_id=ak_id
+        ammo_stack=catalog.ammo_stack, attachments=[] if compatible else catalog.attachment_ids,
+        gun_to_ammo=catalog.gun_to_ammo, gun_to_firemode=catalog.gun_to_firemode,
+        ak_id=None, shotgun_ammo_ids=catalog.ammo_of_type("shotgun"), gun_entries=gun_entries,
     )
+    files = {f"{loot_dir}/chests/house.json": json_text(house_table, minify)}
+
+    # one small variant per guaranteed gun, however many houses use it
+    for gun_id in sorted(set(house_overrides(args).values())):
+        att_table = ""
+        if compatible:
+            mask = catalog.attachment_mask(gun_id)
+            if catalog.attachments_for_mask(mask):
+                att_path = attachments_table_path(catalog, mask)
+                kit_tables.setdefault(att_path, attachments_table(catalog, mask))
+                att_table = f"{ns}:{att_path}"
+        variant = build_variant_loot_table(f"{ns}:chests/house", gun_id, catalog.gun_to_firemode, att_table)
+        files[f"{loot_dir}/{variant_table_path(gun_id)}.json"] = json_text(variant, minify)
+
+    for path in sorted(kit_tables):
+        files[f"{loot_dir}/{path}.json"] = json_text(kit_tables[path], minify)
+    return files
+
+
+def build_structures(loot_table: str) -> Dict[str, bytes]:
+    """name -> gzipped structure template (car, loot_chest, STRUCTURE_MODELS)."""
+    models = {}
+    if ENABLE_BUILD_CAR_FUNCTION:
+        models["car"] = voxel_build.parse_text_model(CAR_MODEL)
+    models["loot_chest"] = {(0, 0, 0): f'minecraft:chest[facing=north]{{LootTable:"{loot_table}"}}'}
+    for name, model_path in STRUCTURE_MODELS.items():
+        models[name] = voxel_build.load_model(Path(model_path).expanduser().resolve())
+    return {name: voxel_build.structure_nbt(blocks, STRUCTURE_DATA_VERSION) for name, blocks in models.items()}
+
+
+def build_place_function(ns: str, name: str) -> str:
+    return "\n".join([
+        f"# Place the {name} template with its corner at your feet (one command instead of a block list)",
+        f"# Run: /function {ns}:place_{name}",
+        f"place template {ns}:{name} ~ ~ ~",
+    ]) + "\n"
+
+
+def build_function_files(args: argparse.Namespace, dests: List[Tuple[int, int, int]]) -> Dict[str, Union[str, bytes]]:
+    """
+    pack.mcmeta, .mcfunction files and structure templates, as {path inside the datapack: text or bytes}.
+    Do not depend on the catalog.
+    """
+    ns = datapack_namespace(args)
+    functions_dir = f"data/{ns}/functions"
+    base_x = _opt(args.base_x, STAGING_BASE_X)
+    y = _opt(args.y, STAGING_Y)
+    z = _opt(args.z, STAGING_Z)
+    houses = _opt(args.houses, STAGING_HOUSES)
+    step_x = _opt(args.step_x, STAGING_STEP_X)
+
+    files: Dict[str, Union[str, bytes]] = {
+        "pack.mcmeta": json_text({
+            "pack": {"pack_format": PACK_FORMAT, "description": "LWI loot generator (auto)"}
+        }, getattr(args, "minify", False)),
+    }
 
-    write_json(loot_dir / "house.json", house_table)
-    write_json(loot_dir / "house_ak.json", house_ak_table)
+    per_tick = _opt(getattr(args, "per_tick", None), SCHEDULE_COMMANDS_PER_TICK)
 
-    functions_dir.mkdir(parents=True, exist_ok=True)
+    def add_function(name: str, text: str) -> None:
+        for rel, body in schedule_function(ns, name, text, per_tick).items():
+            files[f"{functions_dir}/{rel}"] = body
 
-    (functions_dir / "fill_village.mcfunction").write_text(
-        build_fill_function(
-            base_x=args.base_x, y=args.y, z=args.z,
-            houses=args.houses, step_x=args.step_x,
+    normal_table_name = f"{ns}:chests/house"
+    house_tables = {i: f"{ns}:{variant_table_path(g)}" for i, g in house_overrides(args).items()}
+
+    placement = _opt(getattr(args, "placement", None), PLACEMENT_MODE)
+    if placement == "direct":
+        add_function("fill_village", build_direct_fill_function(
+            houses=houses, dests=dests,
             normal_table=normal_table_name,
-            ak_table=ak_table_name,
-            ak_house_index=args.ak_house_index
-        ),
-        encoding="utf-8",
-    )
+            house_tables=house_tables,
+            dimension=STAGING_DIMENSION,
+            forceload=ENABLE_FORCELOAD,
+            tile_chunks=FORCELOAD_TILE_CHUNKS,
+            wait_ticks=FORCELOAD_WAIT_TICKS,
+        ))
+    else:
+        add_function("fill_village", build_fill_function(
+            base_x=base_x, y=y, z=z,
+            houses=houses, step_x=step_x,
+            normal_table=normal_table_name,
+            house_tables=house_tables,
+        ))
 
-    (functions_dir / "update_chests.mcfunction").write_text(
-        build_update_chests_function(
-            base_x=args.base_x, y=args.y, z=args.z,
-            houses=args.houses, step_x=args.step_x,
+        add_function("update_chests", build_update_chests_function(
+            base_x=base_x, y=y, z=z,
+            houses=houses, step_x=step_x,
             dests=dests,
             dimension=STAGING_DIMENSION,
-        ),
-        encoding="utf-8",
-    )
+            forceload=ENABLE_FORCELOAD,
+            tile_chunks=FORCELOAD_TILE_CHUNKS,
+            wait_ticks=FORCELOAD_WAIT_TICKS,
+        ))
 
-    
     if SPAWN_AROUND_CHESTS:
-        spawn_text = build_spawn_mobs_function(
+        add_function("spawn_mobs", build_spawn_mobs_function(
             chest_coords=dests,               # или VILLAGE_CHEST_DESTS
             mobs_per_chest=MOBS_PER_CHEST,
             rmin=SPAWN_RADIUS_MIN,
             rmax=SPAWN_RADIUS_MAX,
             dimension="minecraft:overworld",
-        )
-        (functions_dir / "spawn_mobs.mcfunction").write_text(spawn_text, encoding="utf-8")
+            forceload=ENABLE_FORCELOAD,
+            tile_chunks=FORCELOAD_TILE_CHUNKS,
+            wait_ticks=FORCELOAD_WAIT_TICKS,
+            mode=_opt(getattr(args, "spawn_mode", None), SPAWN_MODE),
+            seed=SPAWN_SEED,
+        ))
 
     if ENABLE_BUILD_CAR_FUNCTION:
-        (functions_dir / "build_car.mcfunction").write_text(
-            build_car_function(CAR_FORWARD_OFFSET),
-            encoding="utf-8"
-        )
-        
+        files[f"{functions_dir}/build_car.mcfunction"] = build_car_function(CAR_FORWARD_OFFSET)
+
+    if ENABLE_STRUCTURES:
+        for name, data in build_structures(normal_table_name).items():
+            files[f"data/{ns}/structures/{name}.nbt"] = data
+            files[f"{functions_dir}/place_{name}.mcfunction"] = build_place_function(ns, name)
+
+    return files
+
+
+MANIFEST_NAME = ".lwi_manifest.json"
+
+
+class DatapackWriter:
+    """
+    Writes datapack files through a manifest of content hashes (<out>/.lwi_manifest.json).
+
+    A file whose content did not change since the last run is not touched (same mtime,
+    nothing for a sync tool to transfer). On close() files of the last run that were not
+    written this time are deleted, and the manifest is saved.
+    As a context manager it closes only when the block succeeds (a failed build deletes nothing).
+    """
+
+    def __init__(self, out_root: Path):
+        self.out_root = out_root
+        self.manifest_path = out_root / MANIFEST_NAME
+        try:
+            obj = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            self.old: Dict[str, str] = dict(obj.get("files") or {})
+        except (OSError, ValueError, AttributeError):
+            self.old = {}
+        self.files: Dict[str, str] = {}
+        self.written: List[str] = []
+        self.skipped = 0
+        self.deleted: List[str] = []
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        digest = hashlib.sha1(data).hexdigest()
+        self.files[rel] = digest
+        path = self.out_root / rel
+        if self.old.get(rel) == digest and path.is_file():
+            self.skipped += 1
+            return
+        if rel not in self.old and path.is_file() and hashlib.sha1(path.read_bytes()).hexdigest() == digest:
+            self.skipped += 1   # same file from a run without manifest
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        self.written.append(rel)
+
+    def write_text(self, rel: str, text: str) -> None:
+        self.write_bytes(rel, text.encode("utf-8"))
+
+    def close(self) -> None:
+        for rel in sorted(set(self.old) - set(self.files)):
+            path = self.out_root / rel
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self.deleted.append(rel)
+            # drop folders left empty (data/<old ns>/functions, ...)
+            for parent in path.parents:
+                if parent == self.out_root or not parent.is_relative_to(self.out_root):
+                    break
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+        if self.files != self.old:
+            self.out_root.mkdir(parents=True, exist_ok=True)
+            self.manifest_path.write_text(
+                json.dumps({"files": dict(sorted(self.files.items()))}, indent=1), encoding="utf-8")
+
+    def __enter__(self) -> "DatapackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.close()
+        return False
+
+
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)  # fixed => the same content gives a byte-identical zip
+
+
+class ZipDatapackWriter:
+    """
+    Streams the datapack into one .zip (world/datapacks loads zipped packs as well).
+
+    Entries are written in build order with fixed timestamps and permissions, so the archive
+    is reproducible. It is built next to the target and only replaces it when the bytes differ.
+    Same counters as DatapackWriter; a replaced archive counts all of its files as written.
+    As a context manager a failed build removes <name>.zip.tmp and leaves the archive as it was.
+    """
+
+    def __init__(self, zip_path: Path):
+        self.zip_path = zip_path
+        zip_path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = zip_path.with_name(zip_path.name + ".tmp")
+        self.zf = zipfile.ZipFile(self.tmp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=9)
+        self.written: List[str] = []
+        self.skipped = 0
+        self.deleted: List[str] = []
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        info = zipfile.ZipInfo(rel, date_time=ZIP_DATE_TIME)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.create_system = 3              # same header bytes on Windows and Linux
+        info.external_attr = 0o644 << 16
+        self.zf.writestr(info, data)
+        self.written.append(rel)
+
+    def write_text(self, rel: str, text: str) -> None:
+        self.write_bytes(rel, text.encode("utf-8"))
+
+    def close(self) -> None:
+        self.zf.close()
+        if self.zip_path.is_file() and filecmp.cmp(self.tmp_path, self.zip_path, shallow=False):
+            self.tmp_path.unlink()
+            self.skipped, self.written = len(self.written), []
+        else:
+            self.tmp_path.replace(self.zip_path)
+
+    def abort(self) -> None:
+        self.zf.close()
+        self.tmp_path.unlink(missing_ok=True)
+        self.written = []
+
+    def __enter__(self) -> "ZipDatapackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def open_writer(out_root: Path) -> Union[DatapackWriter, ZipDatapackWriter]:
+    """--out x.zip => one archive, anything else => a datapack folder."""
+    if out_root.suffix.lower() == ".zip":
+        return ZipDatapackWriter(out_root)
+    return DatapackWriter(out_root)
+
+
+def write_files(writer: Union[DatapackWriter, ZipDatapackWriter], files: Dict[str, Union[str, bytes]]) -> None:
+    for rel, content in files.items():
+        if isinstance(content, bytes):
+            writer.write_bytes(rel, content)
+        else:
+            writer.write_text(rel, content)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate Minecraft datapack from TaCZ summary.csv (or SQLite catalog) for loot chests.")
+    ap.add_argument("--csv", default="", help="Path to summary.csv (from your scan)")
+    ap.add_argument("--catalog", default="",
+                    help="Path to the SQLite catalog (tacz_build_summary.py --sqlite), instead of --csv")
+    add_datapack_args(ap)
+    build_profile.add_profile_args(ap)
+
+    args = ap.parse_args()
+    if bool(args.csv) == bool(args.catalog):
+        ap.error("exactly one of --csv / --catalog is required")
+    try:
+        house_overrides(args)
+    except ValueError as e:
+        ap.error(str(e))
+
+    if args.config:
+        apply_config(load_config(Path(args.config).expanduser().resolve()))
+
+    out_root = Path(args.out).expanduser().resolve()
+    ns = datapack_namespace(args)
+    dests = resolve_dests(args)
+
+    prof = build_profile.start_from_args(args)
+    src_path = Path(args.catalog or args.csv).expanduser().resolve()
+    with phase("read"):
+        lookups = read_summary_sqlite(src_path) if args.catalog else read_summary_csv(src_path)
+    if prof is not None:
+        prof.file(src_path, prof.phases["read"].total, src_path.stat().st_size)
+
+    try:
+        with phase("loot_build"):
+            loot_files = build_loot_files(args, lookups)
+    except ValueError as e:
+        raise SystemExit(f"{e} in {src_path.name}")
+
+    with phase("function_build"):
+        function_files = build_function_files(args, dests)
+    with phase("write"):
+        with open_writer(out_root) as writer:
+            write_files(writer, function_files)
+            write_files(writer, loot_files)
+
     print(" - /function " + ns + ":fill_village")
-    print(" - /function " + ns + ":update_chests")
+    if _opt(args.placement, PLACEMENT_MODE) != "direct":
+        print(" - /function " + ns + ":update_chests")
     print(" - /function " + ns + ":spawn_mobs")
     print(" - /function " + ns + ":build_car")
+    if ENABLE_STRUCTURES:
+        print(" - /function " + ns + ":place_car, " + ns + ":place_loot_chest")
 
-    print(f"Destinations used: {min(args.houses, len(dests))} of {len(dests)} coords")
+    print(f"Destinations used: {min(_opt(args.houses, STAGING_HOUSES), len(dests))} of {len(dests)} coords")
+    print(f"Files: {len(writer.written)} written, {writer.skipped} unchanged, {len(writer.deleted)} deleted")
+    build_profile.finish(args)
 
 
 if __name__ == "__main__":
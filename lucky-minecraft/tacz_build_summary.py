@@ -9,6 +9,10 @@ Build summary.csv from TaCZ pack folders:
   <root>/data/guns/*.json (optional enrich)
   <root>/data/attachments/*.json (optional enrich)
 
+--root may also point at a whole pack (folder or .zip with data/<ns>/...) or at a
+folder holding several packs (e.g. .minecraft/tacz). Zips are read in place, and
+namespaces are taken from the data/<ns> folder names.
+
 It outputs CSV rows like:
   source,index,category,guns, index_id=tacz:glock_17, type=pistol, item_type=..., data_ref=...
   source,index,category,ammo, index_id=tacz:556x45, stack_size=60
@@ -20,39 +24,83 @@ If a file cannot be parsed or misses required fields, it is skipped (logged).
 
 import argparse
 import csv
+import fnmatch
+import hashlib
 import json
+import mmap
+import os
 import re
+import sqlite3
+import time
+import zipfile
+from collections import ChainMap
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+import build_profile
+from build_profile import phase
 
 
 # -----------------------------
 # JSON cleaning (comments, trailing commas)
 # -----------------------------
 
-_RE_BLOCK_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
-_RE_LINE_COMMENT = re.compile(r"(^|[^\:])//.*?$", re.MULTILINE)  # avoid matching "http://"
-_RE_TRAILING_COMMA = re.compile(r",(\s*[\]}])")  # ,] or ,}
-
-def load_json_relaxed(path: Path) -> Dict[str, Any]:
+# One left-to-right pass over the text. String literals are matched first and kept
+# (group 1), so "//" or "/*" inside values (urls, Lua snippets in attachment
+# "function" fields) survive. Everything else that matches is dropped:
+# // line comments, /* */ block comments, and commas followed (through whitespace
+# and comments) by ] or }.
+_RE_RELAXED_TOKEN = re.compile(r"""
+    ( "[^"\\]*(?:\\.[^"\\]*)*" )
+  | //[^\n]*
+  | /\*[^*]*\*+(?:[^/*][^*]*\*+)*/
+  | ,(?=(?:\s|//[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/)*[\]}])
+""", re.VERBOSE)
+
+def strip_json_relaxed(text: str) -> str:
+    """Remove comments and trailing commas outside of string literals."""
+    # split() yields the text between matches plus group 1 (None for dropped tokens);
+    # joining it is done entirely in C, unlike sub(r"\1") which calls back per match
+    return "".join(filter(None, _RE_RELAXED_TOKEN.split(text)))
+
+def loads_relaxed(text: str) -> Dict[str, Any]:
     """
-    Load JSON that may contain // line comments, /* */ block comments, and trailing commas.
+    Parse JSON text that may contain // line comments, /* */ block comments, and trailing commas.
     Raises ValueError if cannot parse.
     """
-    text = path.read_text(encoding="utf-8-sig", errors="strict")
-
-    # strip block comments
-    text = _RE_BLOCK_COMMENT.sub("", text)
-    # strip line comments (but keep "http://")
-    text = _RE_LINE_COMMENT.sub(r"\1", text)
-    # remove trailing commas
-    text = _RE_TRAILING_COMMA.sub(r"\1", text)
-
+    if "/" not in text:
+        # no comments anywhere => most files are plain JSON, skip the copy
+        try:
+            with phase("json_loads"):
+                return json.loads(text)
+        except ValueError:
+            pass  # trailing commas
+    with phase("strip"):
+        text = strip_json_relaxed(text)
     try:
-        return json.loads(text)
+        with phase("json_loads"):
+            return json.loads(text)
     except Exception as e:
         raise ValueError(f"JSON parse failed: {e}") from e
 
+def load_json_relaxed(path: "PackPath") -> Dict[str, Any]:
+    """
+    Load JSON that may contain // line comments, /* */ block comments, and trailing commas.
+    Raises ValueError if cannot parse.
+    """
+    prof = build_profile.active()
+    if prof is None:
+        return loads_relaxed(path.read_text(encoding="utf-8-sig", errors="strict"))
+    t0 = time.perf_counter()
+    with prof.phase("read"):
+        text = path.read_text(encoding="utf-8-sig", errors="strict")
+    try:
+        return loads_relaxed(text)
+    finally:
+        prof.file(path, time.perf_counter() - t0, len(text.encode("utf-8")))
+
 
 # -----------------------------
 # Helpers
@@ -85,197 +133,668 @@ def safe_get(d: Dict[str, Any], key: str, default: Any = None) -> Any:
     v = d.get(key, default)
     return v
 
-def find_data_file(data_root: Path, category: str, index_id: str) -> Optional[Path]:
+def data_ref_key(ref: str, namespace: str) -> str:
     """
-    Try to locate data JSON by:
-      1) using stem of index_id (namespace:id) as filename
-      2) allow subfolder by category: guns/ or attachments/
+    "tacz:ak47_data" -> "tacz:ak47_data"
+    "ak47_data" -> "<namespace>:ak47_data"
+    "" -> ""
     """
-    if ":" in index_id:
-        stem = index_id.split(":", 1)[1]
-    else:
-        stem = index_id
+    stem = ref_to_stem(ref)
+    if not stem:
+        return ""
+    ref = ref.strip()
+    return ref if ":" in ref else f"{namespace}:{stem}"
+
+
+# -----------------------------
+# Pack sources: extracted folders and .zip archives
+# -----------------------------
+
+DEFAULT_NAMESPACE = "tacz"
+
+_RE_ZIP_INDEX_MEMBER = re.compile(r"^((?:[^/]+/)*)data/([^/]+)/index/(?:ammo|guns|attachments)/[^/]+\.json$")
+
+class _MappedFile(mmap.mmap):
+    """Read-only mmap that zipfile accepts as a file object (mmap lacks seekable() before 3.13)."""
+
+    def seekable(self) -> bool:
+        return True
+
+
+# archive path -> (ZipFile over an mmap of the archive, {dir: [child names]})
+_OPEN_ARCHIVES: Dict[str, Tuple[zipfile.ZipFile, Dict[str, List[str]]]] = {}
+
+
+def _open_archive(archive: Path) -> Tuple[zipfile.ZipFile, Dict[str, List[str]]]:
+    """Open (once per process) a zip pack, memory-mapped when possible."""
+    key = str(archive)
+    if key not in _OPEN_ARCHIVES:
+        try:
+            with archive.open("rb") as f:
+                zf = zipfile.ZipFile(_MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError):
+            zf = zipfile.ZipFile(archive)  # empty file / no mmap support
+
+        dirs: Dict[str, List[str]] = {}
+        for name in zf.namelist():
+            if name.endswith("/"):
+                continue
+            parent, _, base = name.rpartition("/")
+            dirs.setdefault(parent, []).append(base)
+            while parent:  # register intermediate folders (zips may omit dir entries)
+                parent = parent.rpartition("/")[0]
+                dirs.setdefault(parent, [])
+        _OPEN_ARCHIVES[key] = (zf, dirs)
+    return _OPEN_ARCHIVES[key]
+
+
+def close_archives() -> None:
+    for zf, _dirs in _OPEN_ARCHIVES.values():
+        zf.close()
+    _OPEN_ARCHIVES.clear()
+
+
+class ZipMember:
+    """
+    File or folder inside a .zip pack. Implements the part of the Path API the
+    scanners use (/, name, stem, exists, glob, read_text), so parse_* work unchanged.
+    Picklable (only the archive path and member name are stored), the archive is
+    reopened lazily in worker processes.
+    """
+
+    __slots__ = ("archive", "member")
+
+    def __init__(self, archive: Path, member: str):
+        self.archive = archive
+        self.member = member.strip("/")
+
+    def __truediv__(self, part: str) -> "ZipMember":
+        return ZipMember(self.archive, f"{self.member}/{part}" if self.member else part)
+
+    def __str__(self) -> str:
+        return f"{self.archive}!{self.member}"
+
+    def __repr__(self) -> str:
+        return f"ZipMember({str(self)!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ZipMember) and (self.archive, self.member) == (other.archive, other.member)
+
+    def __hash__(self) -> int:
+        return hash((self.archive, self.member))
+
+    def __lt__(self, other: "ZipMember") -> bool:
+        return (str(self.archive), self.member) < (str(other.archive), other.member)
+
+    @property
+    def name(self) -> str:
+        return self.member.rpartition("/")[2]
+
+    @property
+    def stem(self) -> str:
+        name = self.name
+        i = name.rfind(".")
+        return name[:i] if i > 0 else name
+
+    @property
+    def parent(self) -> "ZipMember":
+        return ZipMember(self.archive, self.member.rpartition("/")[0])
+
+    def exists(self) -> bool:
+        zf, dirs = _open_archive(self.archive)
+        return self.member in dirs or self.member in zf.NameToInfo
+
+    def glob(self, pattern: str) -> List["ZipMember"]:
+        """Non-recursive glob over the direct children of this folder."""
+        _zf, dirs = _open_archive(self.archive)
+        return [self / n for n in dirs.get(self.member, []) if fnmatch.fnmatchcase(n, pattern)]
 
-    candidate = data_root / category / f"{stem}.json"
-    return candidate if candidate.exists() else None
+    def read_bytes(self) -> bytes:
+        zf, _dirs = _open_archive(self.archive)
+        return zf.read(self.member)
+
+    def read_text(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        return self.read_bytes().decode(encoding, errors)
+
+    def signature(self) -> Optional[List[Any]]:
+        """[crc32, size] of the member (the zip already stores a content checksum)."""
+        zf, _dirs = _open_archive(self.archive)
+        info = zf.NameToInfo.get(self.member)
+        return [info.CRC, info.file_size] if info is not None else None
+
+
+PackPath = Union[Path, ZipMember]
+
+
+class PackRoot(NamedTuple):
+    """One data/<namespace> folder of a gunpack (contains index/ and data/)."""
+    namespace: str
+    index_dir: PackPath
+    data_dir: PackPath
+
+
+def discover_pack_roots(path: Path, namespace: str = "") -> List[PackRoot]:
+    """
+    Accepts any of:
+      - a data/<ns> folder (contains index/): the classic --root
+      - a pack folder or .zip (contains [<pack>/]data/<ns>/index/)
+      - a folder of packs, e.g. .minecraft/tacz/ with a mix of zips and folders
+    Namespaces are taken from the data/<ns> folder names; `namespace` overrides the
+    guess for a classic root that does not sit inside a data/ folder.
+    """
+    if path.is_file():
+        if not zipfile.is_zipfile(path):
+            return []
+        _zf, dirs = _open_archive(path)
+        found = set()
+        for d, names in dirs.items():
+            for n in names:
+                m = _RE_ZIP_INDEX_MEMBER.match(f"{d}/{n}")
+                if m:
+                    found.add((m.group(1), m.group(2)))
+        return [
+            PackRoot(ns, ZipMember(path, f"{prefix}data/{ns}/index"), ZipMember(path, f"{prefix}data/{ns}/data"))
+            for prefix, ns in sorted(found)
+        ]
+
+    if not path.is_dir():
+        return []
+
+    if (path / "index").is_dir():
+        ns = namespace or (path.name if path.parent.name == "data" else DEFAULT_NAMESPACE)
+        return [PackRoot(ns, path / "index", path / "data")]
+
+    if (path / "data").is_dir():
+        return [
+            PackRoot(d.name, d / "index", d / "data")
+            for d in sorted((path / "data").iterdir())
+            if (d / "index").is_dir()
+        ]
+
+    # folder of packs (one level deep)
+    roots: List[PackRoot] = []
+    for child in sorted(path.iterdir()):
+        if child.is_dir() or child.suffix.lower() == ".zip":
+            roots += discover_pack_roots(child, namespace)
+    return roots
+
+
+# -----------------------------
+# Data file lookup index
+# -----------------------------
+
+DATA_CATEGORIES = ("guns", "attachments")
+
+
+def _list_json_files(folder: PackPath) -> List[Tuple[str, PackPath]]:
+    """(stem, path) of the *.json files directly in folder; one directory read, no stat per file."""
+    if isinstance(folder, ZipMember):
+        return [(fp.stem, fp) for fp in folder.glob("*.json")]
+    try:
+        with os.scandir(folder) as it:
+            return [(e.name[:-5], folder / e.name) for e in it if e.name.endswith(".json") and e.is_file()]
+    except OSError:
+        return []
+
+
+class DataFileIndex:
+    """
+    "<ns>:<stem>" -> data/<category>/<stem>.json over all scanned packs, built once.
+
+    Lookups see the pack's own data files first, then those of every other pack (first
+    pack wins), so a gun may point at data in another namespace or another pack.
+    """
+
+    def __init__(self, packs: Iterable[PackRoot]):
+        self.local: Dict[Tuple[PackRoot, str], Dict[str, PackPath]] = {}
+        self.shared: Dict[str, Dict[str, PackPath]] = {c: {} for c in DATA_CATEGORIES}
+        for pack in packs:
+            for category in DATA_CATEGORIES:
+                files = {f"{pack.namespace}:{stem}": fp for stem, fp in _list_json_files(pack.data_dir / category)}
+                self.local[(pack, category)] = files
+                for key, fp in files.items():
+                    self.shared[category].setdefault(key, fp)
+
+    def lookup(self, pack: PackRoot, category: str) -> Mapping[str, PackPath]:
+        return ChainMap(self.local.get((pack, category), {}), self.shared.get(category, {}))
 
 
 # -----------------------------
 # Extractors
 # -----------------------------
 
-def scan_index_ammo(index_dir: Path, namespace: str, errors: List[str]) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    ammo_dir = index_dir / "ammo"
-    if not ammo_dir.exists():
-        errors.append(f"Missing folder: {ammo_dir}")
-        return rows
+# (row or None if skipped, log lines, data refs used => resolved data file or None if missing)
+FileResult = Tuple[Optional[Dict[str, Any]], List[str], Dict[str, Optional[PackPath]]]
 
-    for fp in sorted(ammo_dir.glob("*.json")):
-        index_id = make_index_id(namespace, fp.stem)
-        try:
-            obj = load_json_relaxed(fp)
-            stack_size = obj.get("stack_size", None)
-            if stack_size is None:
-                raise ValueError("missing required field: stack_size")
 
-            # Some packs store stack_size as float/int/string
-            try:
-                stack_size_int = int(float(stack_size))
-            except Exception:
-                raise ValueError(f"bad stack_size: {stack_size!r}")
-
-            rows.append({
-                "source": "index",
-                "category": "ammo",
-                "index_id": index_id,
-                "stack_size": stack_size_int,
-                "name": safe_get(obj, "name", ""),
-                "display": safe_get(obj, "display", ""),
-                "file": str(fp),
-            })
-        except Exception as e:
-            errors.append(f"[SKIP ammo] {fp.name}: {e}")
-            continue
+class ScanOptions(NamedTuple):
+    """What the parsers put into a row (part of the scan cache key)."""
+    keep_raw: bool = False  # add "_raw": {"index": obj, "data": obj} (for the SQLite catalog)
+    columns: Tuple[str, ...] = ()  # projection: only these columns (+ KEY_COLUMNS); () = all
 
-    return rows
+    def wants(self, names: Iterable[str]) -> bool:
+        return not self.columns or any(n in self.columns for n in names)
 
-def scan_index_guns(index_dir: Path, data_dir: Path, namespace: str, errors: List[str]) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    guns_dir = index_dir / "guns"
-    if not guns_dir.exists():
-        errors.append(f"Missing folder: {guns_dir}")
-        return rows
 
-    for fp in sorted(guns_dir.glob("*.json")):
-        index_id = make_index_id(namespace, fp.stem)
-        try:
-            obj = load_json_relaxed(fp)
-
-            gtype = obj.get("type", None)
-            if not gtype:
-                raise ValueError("missing required field: type (pistol/shotgun/rifle/...)")
-
-            row: Dict[str, Any] = {
-                "source": "index",
-                "category": "guns",
-                "index_id": index_id,
-                "type": str(gtype).lower(),
-                "item_type": safe_get(obj, "item_type", ""),
-                "sort": safe_get(obj, "sort", ""),
-                "name": safe_get(obj, "name", ""),
-                "display": safe_get(obj, "display", ""),
-                "data_ref": safe_get(obj, "data", ""),
-                "tooltip": safe_get(obj, "tooltip", ""),
-                "file": str(fp),
-            }
-
-            # Enrich from data/guns/<id>.json if exists
-            data_ref = safe_get(obj, "data", "")
-            data_stem = ref_to_stem(data_ref)
-
-            data_fp = (data_dir / "guns" / f"{data_stem}.json") if data_stem else None
-            if data_fp and not data_fp.exists():
-                data_fp = None  # не нашли — оставим без enrich
-
-            if data_fp:
-                try:
-                    data_obj = load_json_relaxed(data_fp)
-                    row["gun_ammo"] = safe_get(data_obj, "ammo", "")
-                    row["ammo_amount"] = safe_get(data_obj, "ammo_amount", "")
-                    row["weight"] = safe_get(data_obj, "weight", "")
-                    row["rpm"] = safe_get(data_obj, "rpm", "")
-
-                    fire_modes = safe_get(data_obj, "fire_mode", [])
-                    if not isinstance(fire_modes, list):
-                        fire_modes = []
-                    # сохраним в CSV как "auto|semi|burst"
-                    row["fire_mode"] = "|".join(str(x).lower() for x in fire_modes)
-
-                    # выберем дефолт (логично: auto если есть, иначе semi, иначе первый)
-                    fm = [str(x).lower() for x in fire_modes]
-                    if "auto" in fm:
-                        row["default_fire_mode"] = "AUTO"
-                    elif "semi" in fm:
-                        row["default_fire_mode"] = "SEMI"
-                    elif "burst" in fm:
-                        row["default_fire_mode"] = "BURST"
-                    elif fm:
-                        row["default_fire_mode"] = fm[0].upper()
-                    else:
-                        row["default_fire_mode"] = ""
+# Always in a row: the de-dup key.
+KEY_COLUMNS = ("source", "category", "index_id")
+
+# Columns filled from data/<category>/*_data.json; without any of them the data file is not opened.
+DATA_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "guns": ("gun_ammo", "ammo_amount", "weight", "rpm", "fire_mode", "default_fire_mode",
+             "bullet_damage", "bullet_speed", "allow_attachment_types", "data_file"),
+    "attachments": ("weight", "extended_mag_level", "data_file"),
+}
 
-                    bullet = data_obj.get("bullet", {}) if isinstance(data_obj.get("bullet", {}), dict) else {}
-                    row["bullet_damage"] = safe_get(bullet, "damage", "")
-                    row["bullet_speed"] = safe_get(bullet, "speed", "")
-                    row["data_file"] = str(data_fp)
-                except Exception as e:
-                    errors.append(f"[WARN guns data] {data_fp.name}: {e}")
+# --columns shorthands
+COLUMN_PRESETS: Dict[str, Tuple[str, ...]] = {
+    "all": (),
+    # what make_datapack.summary_lookups reads
+    "datapack": ("type", "stack_size", "gun_ammo", "default_fire_mode", "allow_attachment_types"),
+    # everything that comes from index/ files only (no data files opened)
+    "index": ("type", "stack_size", "name", "display", "file", "item_type", "sort", "data_ref", "tooltip"),
+}
 
-            rows.append(row)
 
-        except Exception as e:
-            errors.append(f"[SKIP guns] {fp.name}: {e}")
+def parse_columns(spec: str) -> Tuple[str, ...]:
+    """--columns "datapack" / "index_id,type,gun_ammo" / "index,rpm" -> sorted column tuple (() = all)."""
+    out: set = set()
+    for part in (p.strip() for p in spec.split(",")):
+        if not part:
             continue
+        if part in COLUMN_PRESETS:
+            if not COLUMN_PRESETS[part]:
+                return ()
+            out.update(COLUMN_PRESETS[part])
+        else:
+            out.add(part)
+    return tuple(sorted(out))
 
-    return rows
 
-def scan_index_attachments(index_dir: Path, data_dir: Path, namespace: str, errors: List[str]) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    att_dir = index_dir / "attachments"
-    if not att_dir.exists():
-        errors.append(f"Missing folder: {att_dir}")
-        return rows
+def project_row(row: Dict[str, Any], opts: ScanOptions) -> Dict[str, Any]:
+    if not opts.columns:
+        return row
+    return {k: v for k, v in row.items() if k in KEY_COLUMNS or k in opts.columns or k == "_raw"}
+
+
+def parse_ammo_file(fp: PackPath, namespace: str, opts: ScanOptions = ScanOptions()) -> FileResult:
+    index_id = make_index_id(namespace, fp.stem)
+    try:
+        obj = load_json_relaxed(fp)
+        stack_size = obj.get("stack_size", None)
+        if stack_size is None:
+            raise ValueError("missing required field: stack_size")
 
-    for fp in sorted(att_dir.glob("*.json")):
-        index_id = make_index_id(namespace, fp.stem)
+        # Some packs store stack_size as float/int/string
         try:
-            obj = load_json_relaxed(fp)
-
-            # type is very useful but sometimes may be absent
-            att_type = safe_get(obj, "type", "")
-
-            row: Dict[str, Any] = {
-                "source": "index",
-                "category": "attachments",
-                "index_id": index_id,
-                "type": str(att_type).lower() if att_type else "",
-                "name": safe_get(obj, "name", ""),
-                "display": safe_get(obj, "display", ""),
-                "data_ref": safe_get(obj, "data", ""),
-                "file": str(fp),
-            }
-
-            # Enrich from data/attachments/<id>.json if exists
-            data_ref = safe_get(obj, "data", "")
-            data_stem = ref_to_stem(data_ref)
-
-            data_fp = (data_dir / "attachments" / f"{data_stem}.json") if data_stem else None
-            if data_fp and not data_fp.exists():
-                data_fp = None
-
-            if data_fp:
-                try:
+            stack_size_int = int(float(stack_size))
+        except Exception:
+            raise ValueError(f"bad stack_size: {stack_size!r}")
+
+        row = {
+            "source": "index",
+            "category": "ammo",
+            "index_id": index_id,
+            "stack_size": stack_size_int,
+            "name": safe_get(obj, "name", ""),
+            "display": safe_get(obj, "display", ""),
+            "file": str(fp),
+        }
+        if opts.keep_raw:
+            row["_raw"] = {"index": obj, "data": None}
+        return project_row(row, opts), [], {}
+    except Exception as e:
+        return None, [f"[SKIP ammo] {fp.name}: {e}"], {}
+
+
+def parse_gun_file(fp: PackPath, data_files: Mapping[str, PackPath], namespace: str,
+                   opts: ScanOptions = ScanOptions()) -> FileResult:
+    index_id = make_index_id(namespace, fp.stem)
+    errors: List[str] = []
+    deps: Dict[str, Optional[PackPath]] = {}
+    try:
+        obj = load_json_relaxed(fp)
+
+        gtype = obj.get("type", None)
+        if not gtype:
+            raise ValueError("missing required field: type (pistol/shotgun/rifle/...)")
+
+        row: Dict[str, Any] = {
+            "source": "index",
+            "category": "guns",
+            "index_id": index_id,
+            "type": str(gtype).lower(),
+            "item_type": safe_get(obj, "item_type", ""),
+            "sort": safe_get(obj, "sort", ""),
+            "name": safe_get(obj, "name", ""),
+            "display": safe_get(obj, "display", ""),
+            "data_ref": safe_get(obj, "data", ""),
+            "tooltip": safe_get(obj, "tooltip", ""),
+            "file": str(fp),
+        }
+
+        # Enrich from data/guns/<id>.json if exists (any pack/namespace, see DataFileIndex)
+        data_key = data_ref_key(safe_get(obj, "data", ""), namespace)
+        data_fp = data_files.get(data_key) if data_key else None  # не нашли — оставим без enrich
+        if data_key:
+            deps[data_key] = data_fp
+
+        data_obj = None
+        if data_fp and opts.wants(DATA_COLUMNS["guns"]):
+            try:
+                with phase("enrich"):  # data file: read + parse
                     data_obj = load_json_relaxed(data_fp)
-                    row["weight"] = safe_get(data_obj, "weight", "")
-                    row["extended_mag_level"] = safe_get(data_obj, "extended_mag_level", "")
-                    row["data_file"] = str(data_fp)
-                except Exception as e:
-                    errors.append(f"[WARN attachments data] {data_fp.name}: {e}")
+                row["gun_ammo"] = safe_get(data_obj, "ammo", "")
+                row["ammo_amount"] = safe_get(data_obj, "ammo_amount", "")
+                row["weight"] = safe_get(data_obj, "weight", "")
+                row["rpm"] = safe_get(data_obj, "rpm", "")
+
+                fire_modes = safe_get(data_obj, "fire_mode", [])
+                if not isinstance(fire_modes, list):
+                    fire_modes = []
+                # сохраним в CSV как "auto|semi|burst"
+                row["fire_mode"] = "|".join(str(x).lower() for x in fire_modes)
+
+                # выберем дефолт (логично: auto если есть, иначе semi, иначе первый)
+                fm = [str(x).lower() for x in fire_modes]
+                if "auto" in fm:
+                    row["default_fire_mode"] = "AUTO"
+                elif "semi" in fm:
+                    row["default_fire_mode"] = "SEMI"
+                elif "burst" in fm:
+                    row["default_fire_mode"] = "BURST"
+                elif fm:
+                    row["default_fire_mode"] = fm[0].upper()
+                else:
+                    row["default_fire_mode"] = ""
+
+                bullet = data_obj.get("bullet", {}) if isinstance(data_obj.get("bullet", {}), dict) else {}
+                row["bullet_damage"] = safe_get(bullet, "damage", "")
+                row["bullet_speed"] = safe_get(bullet, "speed", "")
+
+                # attachment types the gun accepts, "scope|grip|..." (matches attachments' "type")
+                allowed = safe_get(data_obj, "allow_attachment_types", [])
+                if not isinstance(allowed, list):
+                    allowed = []
+                row["allow_attachment_types"] = "|".join(str(x).lower() for x in allowed)
+                row["data_file"] = str(data_fp)
+            except Exception as e:
+                data_obj = None
+                errors.append(f"[WARN guns data] {data_fp.name}: {e}")
+
+        if opts.keep_raw:
+            row["_raw"] = {"index": obj, "data": data_obj}
+        return project_row(row, opts), errors, deps
 
-            rows.append(row)
+    except Exception as e:
+        errors.append(f"[SKIP guns] {fp.name}: {e}")
+        return None, errors, deps
 
-        except Exception as e:
-            errors.append(f"[SKIP attachments] {fp.name}: {e}")
-            continue
 
-    return rows
+def parse_attachment_file(fp: PackPath, data_files: Mapping[str, PackPath], namespace: str,
+                          opts: ScanOptions = ScanOptions()) -> FileResult:
+    index_id = make_index_id(namespace, fp.stem)
+    errors: List[str] = []
+    deps: Dict[str, Optional[PackPath]] = {}
+    try:
+        obj = load_json_relaxed(fp)
+
+        # type is very useful but sometimes may be absent
+        att_type = safe_get(obj, "type", "")
+
+        row: Dict[str, Any] = {
+            "source": "index",
+            "category": "attachments",
+            "index_id": index_id,
+            "type": str(att_type).lower() if att_type else "",
+            "name": safe_get(obj, "name", ""),
+            "display": safe_get(obj, "display", ""),
+            "data_ref": safe_get(obj, "data", ""),
+            "file": str(fp),
+        }
+
+        # Enrich from data/attachments/<id>.json if exists
+        data_key = data_ref_key(safe_get(obj, "data", ""), namespace)
+        data_fp = data_files.get(data_key) if data_key else None
+        if data_key:
+            deps[data_key] = data_fp
+
+        data_obj = None
+        if data_fp and opts.wants(DATA_COLUMNS["attachments"]):
+            try:
+                with phase("enrich"):  # data file: read + parse
+                    data_obj = load_json_relaxed(data_fp)
+                row["weight"] = safe_get(data_obj, "weight", "")
+                row["extended_mag_level"] = safe_get(data_obj, "extended_mag_level", "")
+                row["data_file"] = str(data_fp)
+            except Exception as e:
+                data_obj = None
+                errors.append(f"[WARN attachments data] {data_fp.name}: {e}")
+
+        if opts.keep_raw:
+            row["_raw"] = {"index": obj, "data": data_obj}
+        return project_row(row, opts), errors, deps
+
+    except Exception as e:
+        errors.append(f"[SKIP attachments] {fp.name}: {e}")
+        return None, errors, deps
+
+
+SCAN_CATEGORIES = ("ammo", "guns", "attachments")
+
+
+def _iter_files(
+    files: List[PackPath],
+    category: str,
+    namespace: str,
+    parse: Callable[[PackPath], FileResult],
+    errors: List[str],
+    cache: Optional["ScanCache"],
+    executor: Optional[Executor] = None,
+    data_files: Mapping[str, PackPath] = {},
+) -> Iterator[Dict[str, Any]]:
+    # cached files first, then parse the rest (optionally in worker processes)
+    hits = [cache.lookup(category, namespace, fp, data_files) if cache is not None else None for fp in files]
+    todo = [fp for fp, hit in zip(files, hits) if hit is None]
+
+    if executor is not None and len(todo) > 1:
+        # small chunks keep workers balanced, big enough to amortize pickling
+        parsed = iter(executor.map(parse, todo, chunksize=max(1, len(todo) // 64)))
+    else:
+        parsed = map(parse, todo)
+
+    # merge back in file order => same rows/log as a serial run
+    missing: List[str] = []
+    for fp, hit in zip(files, hits):
+        if hit is not None:
+            row, file_errors, deps = hit
+        else:
+            row, file_errors, deps = next(parsed)
+            if cache is not None:
+                cache.store(category, namespace, fp, row, file_errors, deps)
+        errors.extend(file_errors)
+        missing += [f"{key} ({fp.name})" for key, data_fp in deps.items() if data_fp is None]
+        if row is not None:
+            yield row
+
+    if missing:
+        errors.append(f"[MISSING {category} data] {len(missing)} refs not found: " + ", ".join(missing))
+
+
+def iter_index_rows(category: str, index_dir: PackPath, data_files: Mapping[str, PackPath], namespace: str,
+                    errors: List[str], cache: Optional["ScanCache"] = None,
+                    executor: Optional[Executor] = None,
+                    opts: ScanOptions = ScanOptions()) -> Iterator[Dict[str, Any]]:
+    """
+    Rows of one index/<category> folder, in file name order, produced as they are parsed.
+    data_files: "<ns>:<stem>" -> data/<category>/ file (DataFileIndex.lookup).
+    """
+    cat_dir = index_dir / category
+    if not cat_dir.exists():
+        errors.append(f"Missing folder: {cat_dir}")
+        return
+
+    if category == "ammo":
+        parse = partial(parse_ammo_file, namespace=namespace, opts=opts)
+    elif category == "guns":
+        parse = partial(parse_gun_file, data_files=data_files, namespace=namespace, opts=opts)
+    else:
+        parse = partial(parse_attachment_file, data_files=data_files, namespace=namespace, opts=opts)
+
+    with phase("glob"):
+        files = sorted(cat_dir.glob("*.json"))
+    yield from _iter_files(files, category, namespace, parse, errors, cache, executor, data_files)
+
+
+def scan_index_ammo(index_dir: PackPath, namespace: str, errors: List[str],
+                    cache: Optional["ScanCache"] = None,
+                    executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+    return list(iter_index_rows("ammo", index_dir, {}, namespace, errors, cache, executor))
+
+def scan_index_guns(index_dir: PackPath, data_dir: PackPath, namespace: str, errors: List[str],
+                    cache: Optional["ScanCache"] = None,
+                    executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+    pack = PackRoot(namespace, index_dir, data_dir)
+    data_files = DataFileIndex([pack]).lookup(pack, "guns")
+    return list(iter_index_rows("guns", index_dir, data_files, namespace, errors, cache, executor))
+
+def scan_index_attachments(index_dir: PackPath, data_dir: PackPath, namespace: str, errors: List[str],
+                           cache: Optional["ScanCache"] = None,
+                           executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+    pack = PackRoot(namespace, index_dir, data_dir)
+    data_files = DataFileIndex([pack]).lookup(pack, "attachments")
+    return list(iter_index_rows("attachments", index_dir, data_files, namespace, errors, cache, executor))
+
+
+# -----------------------------
+# Incremental scan cache
+# -----------------------------
+
+CACHE_VERSION = 4
+
+
+def file_signature(path: PackPath, with_hash: bool = False) -> Optional[List[Any]]:
+    """[mtime_ns, size] (+ sha1 of content) or None if the file does not exist."""
+    if isinstance(path, ZipMember):
+        return path.signature()
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    sig: List[Any] = [st.st_mtime_ns, st.st_size]
+    if with_hash:
+        sig.append(hashlib.sha1(path.read_bytes()).hexdigest())
+    return sig
+
+
+class ScanCache:
+    """
+    On-disk manifest of parsed rows, so a rebuild only parses changed files.
+
+    Entry key: "<category>|<namespace>|<index file path>". An entry is valid while the index
+    file keeps its signature and every data ref it was enriched from ("<ns>:<stem>")
+    still resolves, through the current DataFileIndex, to the same file with the same
+    signature. A ref that was missing counts as a dependency too, so adding the data
+    file later (in any pack) invalidates the row.
+    Entries for files not seen during the run are dropped on save. A cache written
+    with other ScanOptions is discarded as a whole.
+    """
+
+    def __init__(self, path: Path, use_hash: bool = False, opts: ScanOptions = ScanOptions()):
+        self.path = path
+        self.use_hash = use_hash
+        self.options = json.loads(json.dumps(opts._asdict()))   # as it reads back from the file
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.seen: set = set()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> None:
+        try:
+            obj = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return  # no cache yet / broken cache => full rescan
+        if (not isinstance(obj, dict)
+                or obj.get("version") != CACHE_VERSION
+                or bool(obj.get("hash")) != self.use_hash
+                or obj.get("options") != self.options):
+            return
+        entries = obj.get("entries")
+        if isinstance(entries, dict):
+            self.entries = entries
+
+    def save(self) -> None:
+        entries = {k: v for k, v in self.entries.items() if k in self.seen}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({
+            "version": CACHE_VERSION,
+            "hash": self.use_hash,
+            "options": self.options,
+            "entries": entries,
+        }, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def lookup(self, category: str, namespace: str, fp: PackPath,
+               data_files: Mapping[str, PackPath] = {}) -> Optional[FileResult]:
+        key = f"{category}|{namespace}|{fp}"
+        self.seen.add(key)
+        entry = self.entries.get(key)
+        if entry is not None and entry.get("sig") == file_signature(fp, self.use_hash):
+            deps: Dict[str, Optional[PackPath]] = {}
+            for ref, (path, sig) in (entry.get("deps") or {}).items():
+                data_fp = data_files.get(ref)
+                if (str(data_fp) if data_fp is not None else None) != path:
+                    break
+                if data_fp is not None and file_signature(data_fp, self.use_hash) != sig:
+                    break
+                deps[ref] = data_fp
+            else:
+                self.hits += 1
+                return entry.get("row"), list(entry.get("errors") or []), deps
+        self.misses += 1
+        return None
+
+    def store(self, category: str, namespace: str, fp: PackPath, row: Optional[Dict[str, Any]],
+              errors: List[str], deps: Dict[str, Optional[PackPath]]) -> None:
+        key = f"{category}|{namespace}|{fp}"
+        self.seen.add(key)
+        self.entries[key] = {
+            "sig": file_signature(fp, self.use_hash),
+            "deps": {ref: [str(p), file_signature(p, self.use_hash)] if p is not None else [None, None]
+                     for ref, p in deps.items()},
+            "row": row,
+            "errors": errors,
+        }
 
 
 # -----------------------------
 # CSV writer
 # -----------------------------
 
+# Column schema per category, in CSV order. The union of all three (important columns
+# first) is the header of a full scan, so the streaming writer can emit it up front.
+CSV_PREFERRED_COLUMNS = ["source", "category", "index_id", "type", "stack_size"]
+CSV_SCHEMA: Dict[str, List[str]] = {
+    "ammo": ["source", "category", "index_id", "stack_size", "name", "display", "file"],
+    "guns": ["source", "category", "index_id", "type", "name", "display", "file",
+             "item_type", "sort", "data_ref", "tooltip",
+             "gun_ammo", "ammo_amount", "weight", "rpm", "fire_mode", "default_fire_mode",
+             "bullet_damage", "bullet_speed", "allow_attachment_types", "data_file"],
+    "attachments": ["source", "category", "index_id", "type", "name", "display", "data_ref", "file",
+                    "weight", "extended_mag_level", "data_file"],
+}
+
+
+def csv_schema_header(columns: Tuple[str, ...] = ()) -> List[str]:
+    header = list(CSV_PREFERRED_COLUMNS)
+    for category in SCAN_CATEGORIES:
+        header += [k for k in CSV_SCHEMA[category] if k not in header]
+    if columns:
+        header = [k for k in header if k in KEY_COLUMNS or k in columns]
+    return header
+
+
 def write_csv(out_csv: Path, rows: List[Dict[str, Any]]) -> None:
     out_csv.parent.mkdir(parents=True, exist_ok=True)
 
@@ -284,53 +803,324 @@ def write_csv(out_csv: Path, rows: List[Dict[str, Any]]) -> None:
     seen = set()
     for r in rows:
         for k in r.keys():
-            if k not in seen:
+            if k not in seen and not k.startswith("_"):
                 seen.add(k)
                 keys.append(k)
 
     # put the most important first (for your existing generator)
-    preferred = ["source", "category", "index_id", "type", "stack_size"]
+    preferred = CSV_PREFERRED_COLUMNS
     header = preferred + [k for k in keys if k not in preferred]
 
     with out_csv.open("w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=header)
+        w = csv.DictWriter(f, fieldnames=header, extrasaction="ignore")  # skips "_raw"
         w.writeheader()
         for r in rows:
             w.writerow(r)
 
 
-def main():
-    ap = argparse.ArgumentParser(description="Build summary.csv from TaCZ index/data folders (relaxed JSON parsing).")
-    ap.add_argument("--root", required=True,
-                    help="Path to .../tacz_default_gun/data/tacz (contains index/ and data/)")
-    ap.add_argument("--out", required=True, help="Output CSV path, e.g. D:/summary.csv")
-    ap.add_argument("--namespace", default="tacz", help="Namespace prefix for ids (default: tacz)")
-    ap.add_argument("--log", default="", help="Optional log file to write skipped files/warnings")
+def iter_unique_rows(rows: Iterable[Dict[str, Any]], errors: List[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming de-dup by (source, category, index_id). Only the keys are kept (not the
+    rows), so memory grows with the number of unique ids, not with row size. Unlike the
+    in-memory de-dup in main() the first row of an id wins (it may already be written);
+    later duplicates are logged.
+    """
+    seen = set()
+    for r in rows:
+        key = (str(r.get("source", "")), str(r.get("category", "")), str(r.get("index_id", "")))
+        if key in seen:
+            errors.append(f"[DUP {key[1]}] {key[2]}: {r.get('file', '')} (first one kept)")
+            continue
+        seen.add(key)
+        yield r
 
-    args = ap.parse_args()
 
-    root = Path(args.root).expanduser().resolve()
-    out_csv = Path(args.out).expanduser().resolve()
-    namespace = args.namespace.strip()
+class CsvStreamWriter:
+    """Writes rows as they arrive, with the fixed CSV_SCHEMA header (projected to columns)."""
 
-    index_dir = root / "index"
-    data_dir = root / "data"
+    def __init__(self, out_csv: Path, columns: Tuple[str, ...] = ()):
+        out_csv.parent.mkdir(parents=True, exist_ok=True)
+        self.f = out_csv.open("w", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.f, fieldnames=csv_schema_header(columns), extrasaction="ignore")
+        self.writer.writeheader()
+        self.written = 0
 
-    errors: List[str] = []
-    rows: List[Dict[str, Any]] = []
+    def add(self, row: Dict[str, Any]) -> None:
+        self.writer.writerow(row)
+        self.written += 1
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def write_csv_stream(out_csv: Path, rows: Iterable[Dict[str, Any]], columns: Tuple[str, ...] = ()) -> int:
+    """Write rows as they arrive (CsvStreamWriter). Returns rows written."""
+    writer = CsvStreamWriter(out_csv, columns)
+    try:
+        for r in rows:
+            writer.add(r)
+    finally:
+        writer.close()
+    return writer.written
+
+
+# -----------------------------
+# SQLite catalog writer
+# -----------------------------
+
+# Typed columns of the "items" table (CSV column names, so both outputs read alike).
+SQLITE_ITEM_COLUMNS: List[Tuple[str, str]] = [
+    ("source", "TEXT"),
+    ("category", "TEXT NOT NULL"),
+    ("index_id", "TEXT NOT NULL"),
+    ("type", "TEXT"),
+    ("stack_size", "INTEGER"),
+    ("name", "TEXT"),
+    ("display", "TEXT"),
+    ("item_type", "TEXT"),
+    ("sort", "INTEGER"),
+    ("data_ref", "TEXT"),
+    ("tooltip", "TEXT"),
+    ("gun_ammo", "TEXT"),
+    ("ammo_amount", "INTEGER"),
+    ("weight", "REAL"),
+    ("rpm", "INTEGER"),
+    ("fire_mode", "TEXT"),
+    ("default_fire_mode", "TEXT"),
+    ("bullet_damage", "REAL"),
+    ("bullet_speed", "REAL"),
+    ("allow_attachment_types", "TEXT"),
+    ("extended_mag_level", "INTEGER"),
+    ("file", "TEXT"),
+    ("data_file", "TEXT"),
+]
+
+SQLITE_SCHEMA = """
+CREATE TABLE items ({columns}, PRIMARY KEY (category, index_id));
+CREATE INDEX items_category_type ON items (category, type);
+CREATE INDEX items_gun_ammo ON items (gun_ammo, category, type);
+CREATE TABLE raw_json (
+    category TEXT NOT NULL,
+    index_id TEXT NOT NULL,
+    index_json TEXT,
+    data_json TEXT,
+    PRIMARY KEY (category, index_id)
+);
+""".format(columns=", ".join(f"{name} {decl}" for name, decl in SQLITE_ITEM_COLUMNS))
+
+
+def _sql_value(value: Any, decl: str) -> Any:
+    """CSV-ish row value -> typed SQLite value ("" / unparsable number -> NULL)."""
+    if value is None or value == "":
+        return None
+    try:
+        if decl.startswith("INTEGER"):
+            return int(float(value))
+        if decl.startswith("REAL"):
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+class SqliteCatalogWriter:
+    """
+    Writes rows into a fresh SQLite catalog (built next to db_path, swapped in on close).
+    replace=True: the last row of an id wins (like the CSV de-dup), False: the first.
+    """
+
+    def __init__(self, db_path: Path, replace: bool = True):
+        self.db_path = db_path
+        self.tmp_path = db_path.with_name(db_path.name + ".tmp")
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.tmp_path.exists():
+            self.tmp_path.unlink()
+        self.conn = sqlite3.connect(str(self.tmp_path))
+        self.conn.executescript(SQLITE_SCHEMA)
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        names = [name for name, _decl in SQLITE_ITEM_COLUMNS]
+        self.item_sql = f"{verb} INTO items ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+        self.raw_sql = f"{verb} INTO raw_json (category, index_id, index_json, data_json) VALUES (?, ?, ?, ?)"
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.conn.execute(self.item_sql, [_sql_value(row.get(name), decl) for name, decl in SQLITE_ITEM_COLUMNS])
+        raw = row.get("_raw")
+        if raw is not None:
+            self.conn.execute(self.raw_sql, (
+                row.get("category"), row.get("index_id"),
+                json.dumps(raw.get("index"), ensure_ascii=False),
+                json.dumps(raw["data"], ensure_ascii=False) if raw.get("data") is not None else None,
+            ))
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+        self.tmp_path.replace(self.db_path)
+
+    def abort(self) -> None:
+        """Drop the half-written catalog, db_path stays as it was."""
+        self.conn.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def write_sqlite(db_path: Path, rows: Iterable[Dict[str, Any]]) -> None:
+    w = SqliteCatalogWriter(db_path)
+    try:
+        for r in rows:
+            w.add(r)
+    except BaseException:
+        w.abort()
+        raise
+    w.close()
 
-    rows += scan_index_ammo(index_dir, namespace, errors)
-    rows += scan_index_guns(index_dir, data_dir, namespace, errors)
-    rows += scan_index_attachments(index_dir, data_dir, namespace, errors)
 
-    # de-dup by (source, category, index_id)
+# -----------------------------
+# Whole-pack scan
+# -----------------------------
+
+def iter_pack_rows(pack: PackRoot, errors: List[str],
+                   cache: Optional[ScanCache] = None,
+                   executor: Optional[Executor] = None,
+                   opts: ScanOptions = ScanOptions(),
+                   data_index: Optional[DataFileIndex] = None) -> Iterator[Dict[str, Any]]:
+    """data_index: shared index over all scanned packs (default: this pack only)."""
+    if data_index is None:
+        data_index = DataFileIndex([pack])
+    for category in SCAN_CATEGORIES:
+        yield from iter_index_rows(category, pack.index_dir, data_index.lookup(pack, category),
+                                   pack.namespace, errors, cache, executor, opts)
+
+
+def dedup_rows(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """De-dup by (source, category, index_id); the last row wins, kept at the first one's position."""
     uniq: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
     for r in rows:
         key = (str(r.get("source","")), str(r.get("category","")), str(r.get("index_id","")))
         uniq[key] = r
-    rows = list(uniq.values())
+    return list(uniq.values())
+
+
+def tee_rows(rows: Iterable[Dict[str, Any]], sink: Callable[[Dict[str, Any]], None]) -> Iterator[Dict[str, Any]]:
+    """Pass rows through, handing each one to sink (a side output) first."""
+    for r in rows:
+        sink(r)
+        yield r
+
+
+def scan_pack_root(pack: PackRoot, errors: List[str],
+                   cache: Optional[ScanCache] = None,
+                   executor: Optional[Executor] = None,
+                   opts: ScanOptions = ScanOptions(),
+                   data_index: Optional[DataFileIndex] = None) -> List[Dict[str, Any]]:
+    return list(iter_pack_rows(pack, errors, cache, executor, opts, data_index))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build summary.csv from TaCZ index/data folders (relaxed JSON parsing).")
+    ap.add_argument("--root", required=True, nargs="+",
+                    help="Path to .../tacz_default_gun/data/tacz (contains index/ and data/), "
+                         "a pack folder or .zip, or a folder with several packs (e.g. .minecraft/tacz)")
+    ap.add_argument("--out", default="", help="Output CSV path, e.g. D:/summary.csv")
+    ap.add_argument("--sqlite", default="",
+                    help="Also/instead write a typed SQLite catalog (items + raw_json tables), e.g. D:/catalog.db")
+    ap.add_argument("--namespace", default="",
+                    help="Namespace prefix for ids when it can't be taken from a data/<ns> folder "
+                         f"(default: auto, else {DEFAULT_NAMESPACE})")
+    ap.add_argument("--log", default="", help="Optional log file to write skipped files/warnings")
+    ap.add_argument("--cache", default="",
+                    help="Optional scan cache file; unchanged files are not re-parsed on the next run")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Parse files in N worker processes (0 = one per CPU; default: 1 = serial)")
+    ap.add_argument("--cache-hash", action="store_true",
+                    help="Also compare file content hashes (slower, robust to mtime-preserving copies)")
+    ap.add_argument("--stream", action="store_true",
+                    help="Write rows as they are scanned with the fixed column schema (flat memory; "
+                         "on duplicate ids the first one wins)")
+    ap.add_argument("--columns", default="all",
+                    help="Only these columns, comma-separated, or a preset: all, datapack (what "
+                         "make_datapack.py reads), index (no data files opened). Presets and names mix, "
+                         "e.g. index,rpm. source/category/index_id are always kept")
+    build_profile.add_profile_args(ap)
+
+    args = ap.parse_args()
+    if not args.out and not args.sqlite:
+        ap.error("at least one of --out / --sqlite is required")
+    if build_profile.start_from_args(args) is not None and args.jobs != 1:
+        print("--profile: parsing serially (worker processes are not profiled)")
+        args.jobs = 1
+
+    out_csv = Path(args.out).expanduser().resolve() if args.out else None
+    out_db = Path(args.sqlite).expanduser().resolve() if args.sqlite else None
+    opts = ScanOptions(keep_raw=out_db is not None, columns=parse_columns(args.columns))
+    unknown = [c for c in opts.columns if c not in csv_schema_header()]
+    if unknown:
+        ap.error(f"unknown --columns: {', '.join(unknown)}")
+    namespace = args.namespace.strip()
 
-    write_csv(out_csv, rows)
+    errors: List[str] = []
+    rows: List[Dict[str, Any]] = []
+
+    packs: List[PackRoot] = []
+    with phase("glob"):
+        for r in args.root:
+            root = Path(r).expanduser().resolve()
+            found = discover_pack_roots(root, namespace)
+            if not found:
+                errors.append(f"No TaCZ pack found in: {root}")
+            packs += found
+
+    cache: Optional[ScanCache] = None
+    if args.cache:
+        cache = ScanCache(Path(args.cache).expanduser().resolve(), use_hash=args.cache_hash, opts=opts)
+        with phase("cache"):
+            cache.load()
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    executor: Optional[Executor] = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        with phase("glob"):
+            data_index = DataFileIndex(packs)   # one directory listing per data/ folder
+        if args.stream:
+            row_iter = iter_unique_rows(
+                (r for pack in packs for r in iter_pack_rows(pack, errors, cache, executor, opts, data_index)), errors)
+            db_writer = SqliteCatalogWriter(out_db, replace=False) if out_db else None
+            if db_writer is not None:
+                row_iter = tee_rows(row_iter, db_writer.add)
+            with phase("scan+write"):
+                try:
+                    if out_csv is not None:
+                        row_count = write_csv_stream(out_csv, row_iter, opts.columns)
+                    else:
+                        row_count = sum(1 for _ in row_iter)
+                except BaseException:
+                    if db_writer is not None:
+                        db_writer.abort()
+                    raise
+                if db_writer is not None:
+                    db_writer.close()
+        else:
+            with phase("scan"):
+                for pack in packs:
+                    rows += scan_pack_root(pack, errors, cache, executor, opts, data_index)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        close_archives()
+
+    if cache is not None:
+        with phase("cache"):
+            cache.save()
+
+    if not args.stream:
+        with phase("dedup"):
+            rows = dedup_rows(rows)
+        row_count = len(rows)
+
+        with phase("write"):
+            if out_csv is not None:
+                write_csv(out_csv, rows)
+            if out_db is not None:
+                write_sqlite(out_db, rows)
 
     # logging
     if args.log:
@@ -338,14 +1128,20 @@ def main():
         log_path.parent.mkdir(parents=True, exist_ok=True)
         log_path.write_text("\n".join(errors) + ("\n" if errors else ""), encoding="utf-8")
 
-    print("OK:", out_csv)
-    print("Rows:", len(rows))
+    for out in (out_csv, out_db):
+        if out is not None:
+            print("OK:", out)
+    print("Packs:", len(packs))
+    print("Rows:", row_count)
+    if cache is not None:
+        print(f"Cache: {cache.hits} reused, {cache.misses} parsed")
     if errors:
         print("Skipped/Warned:", len(errors))
         if not args.log:
             # show a few
             for line in errors[:15]:
                 print(line)
+    build_profile.finish(args)
 
 
 if __name__ == "__main__":
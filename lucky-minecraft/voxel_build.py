@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# COMMAND FOR START:
+#   python .\voxel_build.py --model ".\house.txt" --out ".\build_house.mcfunction"
+#   python .\voxel_build.py --model ".\house.json" --out ".\build_house.mcfunction" --absolute 100 64 200
+
+"""
+Compile a voxel model (text layers or JSON) into few fill commands: cells with the same
+block are merged into boxes greedily (x run -> z rows -> y layers).
+
+Text model:
+  # comment
+  R = minecraft:red_concrete      palette: one character -> block id
+  origin = 2 0 1                  optional, model cell placed at ^ ^ ^ (or at --absolute)
+  ---                             starts the next layer (bottom to top)
+  _RRR_                           one row; the first row of every layer is the front,
+  _R.R_                           characters go left to right (as seen from behind)
+  "." or space = leave the world block as it is, "_" = air (see --no-clear)
+
+JSON model:
+  {"palette": {"R": "minecraft:red_concrete"}, "layers": [["_RRR_", ...], ...], "origin": [2, 0, 1]}
+  {"blocks": [[x, y, z, "minecraft:stone"], ...], "origin": [0, 0, 0]}    (x = right, y = up, z = forward)
+
+Output coordinates (model x = right, y = up, z = forward, relative to origin):
+  relative (default): ^-x ^y ^z, i.e. built facing the executor
+  --absolute X Y Z:   X-x Y+y Z+z, i.e. built as if facing south (right = west, forward = south),
+                      the same model as a relative build run facing south
+  --structure:        gzipped NBT structure template for /place template, same facing as --absolute
+                      (model right = -x / west, forward = +z / south);
+                      "." cells are left out (structure void)
+
+Palette blocks may carry block states and flat block entity data, e.g.
+  C = minecraft:chest[facing=south]{LootTable:"village:chests/house"}
+"""
+
+import argparse
+import gzip
+import json
+import re
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+Coord = Tuple[int, int, int]
+# (x1, y1, z1, x2, y2, z2, block), x1 <= x2 etc.
+Box = Tuple[int, int, int, int, int, int, str]
+
+AIR = "minecraft:air"
+KEEP_CHARS = ". "
+AIR_CHAR = "_"
+FILL_LIMIT = 32768  # max blocks per /fill
+
+
+# -----------------------------
+# Model parsing
+# -----------------------------
+
+def _layers_to_blocks(layers: List[List[str]], palette: Dict[str, str], origin: Coord) -> Dict[Coord, str]:
+    ox, oy, oz = origin
+    blocks: Dict[Coord, str] = {}
+    # first row = front = largest z, the same z in every layer (a shorter layer lacks back rows)
+    depth = max((len(rows) for rows in layers), default=0)
+    for y, rows in enumerate(layers):
+        for r, row in enumerate(rows):
+            z = depth - 1 - r
+            for x, ch in enumerate(row):
+                if ch in KEEP_CHARS:
+                    continue
+                if ch == AIR_CHAR:
+                    block = palette.get(ch, AIR)
+                elif ch in palette:
+                    block = palette[ch]
+                else:
+                    raise ValueError(f"Unknown palette character {ch!r} (layer {y}, row {r})")
+                blocks[(x - ox, y - oy, z - oz)] = block
+    return blocks
+
+
+def parse_text_model(text: str) -> Dict[Coord, str]:
+    palette: Dict[str, str] = {}
+    origin: Coord = (0, 0, 0)
+    layers: List[List[str]] = [[]]
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped == "---":
+            if layers[-1]:
+                layers.append([])
+            continue
+        key, sep, value = stripped.partition("=")
+        if sep and len(key.strip()) == 1 and ":" in value:
+            palette[key.strip()] = value.strip()
+        elif sep and key.strip() == "origin":
+            x, y, z = (int(v) for v in value.split())
+            origin = (x, y, z)
+        else:
+            layers[-1].append(line.lstrip("\t"))
+    if not layers[-1]:
+        layers.pop()
+    return _layers_to_blocks(layers, palette, origin)
+
+
+def parse_json_model(obj: Dict) -> Dict[Coord, str]:
+    ox, oy, oz = (int(v) for v in obj.get("origin") or (0, 0, 0))
+    if "blocks" in obj:
+        return {(int(x) - ox, int(y) - oy, int(z) - oz): str(b) for x, y, z, b in obj["blocks"]}
+    return _layers_to_blocks(obj.get("layers") or [], dict(obj.get("palette") or {}), (ox, oy, oz))
+
+
+def load_model(path: Path) -> Dict[Coord, str]:
+    text = path.read_text(encoding="utf-8-sig")
+    if path.suffix.lower() == ".json":
+        return parse_json_model(json.loads(text))
+    return parse_text_model(text)
+
+
+# -----------------------------
+# Greedy box merging
+# -----------------------------
+
+def greedy_boxes(blocks: Dict[Coord, str], skip: Iterable[str] = ()) -> List[Box]:
+    """
+    Cover the cells with boxes of one block each: from the lowest unvisited cell grow
+    along x, then the x run along z, then the rectangle along y. Not always the minimum,
+    but close on real builds and linear in the number of cells.
+    """
+    skip = set(skip)
+    todo = {c: b for c, b in blocks.items() if b not in skip}
+    boxes: List[Box] = []
+
+    def free(c: Coord, b: str) -> bool:
+        return todo.get(c) == b
+
+    for start in sorted(todo, key=lambda c: (c[1], c[2], c[0])):
+        b = todo.get(start)
+        if b is None:
+            continue   # already inside a box
+        x1, y1, z1 = start
+        x2, y2, z2 = start
+        while free((x2 + 1, y1, z1), b) and (x2 - x1 + 2) <= FILL_LIMIT:
+            x2 += 1
+        width = x2 - x1 + 1
+        while (width * (z2 - z1 + 2) <= FILL_LIMIT
+               and all(free((x, y1, z2 + 1), b) for x in range(x1, x2 + 1))):
+            z2 += 1
+        area = width * (z2 - z1 + 1)
+        while (area * (y2 - y1 + 2) <= FILL_LIMIT
+               and all(free((x, y2 + 1, z), b) for x in range(x1, x2 + 1) for z in range(z1, z2 + 1))):
+            y2 += 1
+        for y in range(y1, y2 + 1):
+            for z in range(z1, z2 + 1):
+                for x in range(x1, x2 + 1):
+                    del todo[(x, y, z)]
+        boxes.append((x1, y1, z1, x2, y2, z2, b))
+    return boxes
+
+
+def bounding_box(blocks: Iterable[Coord]) -> Tuple[int, int, int, int, int, int]:
+    xs, ys, zs = zip(*blocks)
+    return min(xs), min(ys), min(zs), max(xs), max(ys), max(zs)
+
+
+# -----------------------------
+# Commands
+# -----------------------------
+
+def _pos(x: int, y: int, z: int, absolute: Optional[Coord]) -> str:
+    if absolute is None:
+        return f"^{-x} ^{y} ^{z}"
+    # facing south: ^left = east => model right (x) = west
+    return f"{absolute[0] - x} {absolute[1] + y} {absolute[2] + z}"
+
+
+def box_commands(boxes: Iterable[Box], absolute: Optional[Coord] = None, prefix: str = "") -> List[str]:
+    """setblock for single cells, fill for the rest. prefix: e.g. "execute ... run "."""
+    lines: List[str] = []
+    for x1, y1, z1, x2, y2, z2, b in boxes:
+        if (x1, y1, z1) == (x2, y2, z2):
+            lines.append(f"{prefix}setblock {_pos(x1, y1, z1, absolute)} {b}")
+        else:
+            lines.append(f"{prefix}fill {_pos(x1, y1, z1, absolute)} {_pos(x2, y2, z2, absolute)} {b}")
+    return lines
+
+
+def compile_model(blocks: Dict[Coord, str], absolute: Optional[Coord] = None,
+                  prefix: str = "", clear: bool = True) -> List[str]:
+    """
+    clear: when the model fills its whole bounding box (no "." cells, no short rows), one
+    "fill ... air" over the box first, then only the non-air boxes (air cells cost nothing
+    extra). Otherwise air cells are merged like any block, so "." cells keep the world block.
+    """
+    if not blocks:
+        return []
+    x1, y1, z1, x2, y2, z2 = bounding_box(blocks)
+    if not clear or len(blocks) != (x2 - x1 + 1) * (y2 - y1 + 1) * (z2 - z1 + 1):
+        return box_commands(greedy_boxes(blocks), absolute, prefix)
+    lines = box_commands([(x1, y1, z1, x2, y2, z2, AIR)], absolute, prefix)
+    lines[0] += " replace"
+    return lines + box_commands(greedy_boxes(blocks, skip=(AIR,)), absolute, prefix)
+
+
+# -----------------------------
+# NBT structure templates (no external dependency)
+# -----------------------------
+
+STRUCTURE_DATA_VERSION = 3465  # Minecraft 1.20.1
+
+
+class NbtByte(int):
+    pass
+
+
+class NbtShort(int):
+    pass
+
+
+class NbtLong(int):
+    pass
+
+
+class NbtFloat(float):
+    pass
+
+
+# plain int => TAG_Int, plain float => TAG_Double
+_NBT_IDS = ((bool, 1), (NbtByte, 1), (NbtShort, 2), (NbtLong, 4), (int, 3),
+            (NbtFloat, 5), (float, 6), (str, 8), (list, 9), (dict, 10))
+
+
+def _nbt_id(value: Any) -> int:
+    for t, tag_id in _NBT_IDS:
+        if isinstance(value, t):
+            return tag_id
+    raise TypeError(f"No NBT tag for {type(value).__name__}")
+
+
+def _nbt_payload(out: bytearray, value: Any) -> None:
+    tag_id = _nbt_id(value)
+    if tag_id == 1:
+        out += struct.pack(">b", int(value))
+    elif tag_id == 2:
+        out += struct.pack(">h", value)
+    elif tag_id == 3:
+        out += struct.pack(">i", value)
+    elif tag_id == 4:
+        out += struct.pack(">q", value)
+    elif tag_id == 5:
+        out += struct.pack(">f", value)
+    elif tag_id == 6:
+        out += struct.pack(">d", value)
+    elif tag_id == 8:
+        raw = value.encode("utf-8")
+        out += struct.pack(">H", len(raw)) + raw
+    elif tag_id == 9:
+        out += struct.pack(">bi", _nbt_id(value[0]) if value else 0, len(value))
+        for item in value:
+            _nbt_payload(out, item)
+    else:
+        for key, item in value.items():
+            raw = key.encode("utf-8")
+            out += struct.pack(">bH", _nbt_id(item), len(raw)) + raw
+            _nbt_payload(out, item)
+        out += b"\x00"
+
+
+def nbt_bytes(root: Dict[str, Any]) -> bytes:
+    """Uncompressed NBT of a root compound (empty name)."""
+    out = bytearray(b"\x0a\x00\x00")
+    _nbt_payload(out, root)
+    return bytes(out)
+
+
+_RE_BLOCK_SPEC = re.compile(r"^([^\[{]+)(?:\[([^\]]*)\])?(?:\{(.*)\})?$")
+_RE_SNBT_PAIR = re.compile(r'\s*(\w+)\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+[bBsSlL]?|-?\d*\.\d+[fFdD]?)\s*(?:,|$)')
+
+
+def parse_block_spec(spec: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """"minecraft:chest[facing=south]{LootTable:"x"}" -> (name, properties, block entity data)."""
+    m = _RE_BLOCK_SPEC.match(spec.strip())
+    if not m:
+        raise ValueError(f"Bad block: {spec}")
+    name, props_text, nbt_text = m.groups()
+    props = dict(p.split("=", 1) for p in props_text.split(",") if "=" in p) if props_text else {}
+    nbt: Dict[str, Any] = {}
+    pos = 0
+    text = nbt_text or ""
+    while pos < len(text):
+        pm = _RE_SNBT_PAIR.match(text, pos)
+        if not pm:
+            raise ValueError(f"Only flat string/number block data is supported: {spec}")
+        key, raw = pm.groups()
+        if raw.startswith('"'):
+            nbt[key] = json.loads(raw)
+        elif raw[-1] in "bB":
+            nbt[key] = NbtByte(int(raw[:-1]))
+        elif raw[-1] in "sS":
+            nbt[key] = NbtShort(int(raw[:-1]))
+        elif raw[-1] in "lL":
+            nbt[key] = NbtLong(int(raw[:-1]))
+        elif raw[-1] in "fF":
+            nbt[key] = NbtFloat(float(raw[:-1]))
+        elif "." in raw:
+            nbt[key] = float(raw.rstrip("dD"))
+        else:
+            nbt[key] = int(raw)
+        pos = pm.end()
+    return name.strip(), props, nbt
+
+
+def structure_nbt(blocks: Dict[Coord, str], data_version: int = STRUCTURE_DATA_VERSION) -> bytes:
+    """
+    Gzipped structure template, built as if facing south like --absolute (model x is mirrored
+    onto structure -x, forward = +z). The template origin (/place corner) is the model's bottom
+    back corner on the right: max x, min y, min z.
+    """
+    x0, y0, z0, x1, y1, z1 = bounding_box(blocks)
+    palette: List[Dict[str, Any]] = []
+    state_ids: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}
+    entries: List[Dict[str, Any]] = []
+    for (x, y, z), spec in sorted(blocks.items(), key=lambda kv: (kv[0][1], kv[0][2], kv[0][0])):
+        name, props, nbt = parse_block_spec(spec)
+        key = (name, tuple(sorted(props.items())))
+        if key not in state_ids:
+            state_ids[key] = len(palette)
+            palette.append({"Name": name, "Properties": dict(key[1])} if props else {"Name": name})
+        entry: Dict[str, Any] = {"pos": [x1 - x, y - y0, z - z0], "state": state_ids[key]}
+        if nbt:
+            entry["nbt"] = {"id": name, **nbt}
+        entries.append(entry)
+    root = {
+        "DataVersion": data_version,
+        "size": [x1 - x0 + 1, y1 - y0 + 1, z1 - z0 + 1],
+        "palette": palette,
+        "blocks": entries,
+        "entities": [],
+    }
+    return gzip.compress(nbt_bytes(root), mtime=0)   # mtime=0 => same bytes every build
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compile a voxel model into a .mcfunction of merged fill commands.")
+    ap.add_argument("--model", required=True, help="Model file: text layers (.txt) or JSON (.json)")
+    ap.add_argument("--out", required=True, help="Output .mcfunction path")
+    ap.add_argument("--absolute", type=int, nargs=3, metavar=("X", "Y", "Z"), default=None,
+                    help="Build at these world coords (as if facing south) instead of relative to the executor (^ ^ ^)")
+    ap.add_argument("--forward", type=int, default=0,
+                    help="Relative mode: build N blocks in front of the executor")
+    ap.add_argument("--no-clear", action="store_true",
+                    help="Never clear the bounding box first, fill '_' cells with air like any block "
+                         "(a model with '.' cells is always built that way)")
+    ap.add_argument("--structure", action="store_true",
+                    help="Write a structure template (.nbt) for /place template instead of a .mcfunction")
+    args = ap.parse_args()
+
+    model_path = Path(args.model).expanduser().resolve()
+    blocks = load_model(model_path)
+    out = Path(args.out).expanduser().resolve()
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    if args.structure:
+        out.write_bytes(structure_nbt(blocks))
+        print("OK:", out)
+        print(f"Cells: {len(blocks)}, 1 template")
+        return
+
+    absolute = tuple(args.absolute) if args.absolute else None
+    prefix = "" if absolute else f"execute rotated as @s positioned ^ ^ ^{args.forward} run "
+    commands = compile_model(blocks, absolute, prefix, clear=not args.no_clear)
+
+    out.write_text("\n".join([f"# Built from {model_path.name} by voxel_build.py", ""] + commands) + "\n",
+                   encoding="utf-8")
+    print("OK:", out)
+    print(f"Cells: {len(blocks)}, commands: {len(commands)}")
+
+
+if __name__ == "__main__":
+    main()